@@ -51,6 +51,7 @@ INSTALLED_APPS = [
     "core",
     "dashboard",
     "webhooks",
+    "search",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -156,14 +157,41 @@ DATABASES = {
 # Cloudflare Buckets env
 CF_ACCOUNT_ID = os.environ.get("CF_ACCOUNT_ID")
 CF_VIDEO_IMAGE_TOKEN = os.environ.get("CF_VIDEO_IMAGE_TOKEN")
+# Stream signing key to sign the video tokens locally instead of calling
+# the Cloudflare API. The key is the base64 encoded PEM given by Cloudflare.
+CF_STREAM_SIGNING_KEY_ID = env("CF_STREAM_SIGNING_KEY_ID", default=None)
+CF_STREAM_SIGNING_KEY = env("CF_STREAM_SIGNING_KEY", default=None)
+# Seconds a locally signed video token is valid
+CF_STREAM_TOKEN_TTL = env.int("CF_STREAM_TOKEN_TTL", default=60 * 60)
 
 # env for public exams
 EXAMS_ACCESS_KEY_ID = os.environ.get("EXAMS_R2_ACCESS_KEY_ID")
 EXAMS_SECRET_ACCESS_KEY = os.environ.get("EXAMS_R2_SECRET_ACCESS_KEY")
 EXAMS_BUCKET_NAME = os.environ.get("EXAMS_R2_BUCKET_NAME")
+# Overrides the R2 endpoint, e.g. to use a local S3 compatible server
+EXAMS_R2_ENDPOINT_URL = env("EXAMS_R2_ENDPOINT_URL", default=None)
+R2_MAX_POOL_CONNECTIONS = env.int("R2_MAX_POOL_CONNECTIONS", default=50)
+# How exams, product documents and receipts are delivered: "stream",
+# "presigned" (only R2 documents) or "accel" (nginx X-Accel-Redirect)
+DOCUMENT_DOWNLOAD_MODE = env("DOCUMENT_DOWNLOAD_MODE", default="stream")
+# Size in bytes of the chunks read from R2 when streaming a document
+DOCUMENT_STREAM_CHUNK_SIZE = env.int(
+    "DOCUMENT_STREAM_CHUNK_SIZE", default=1024 * 1024
+)
+# Seconds a presigned download URL is valid
+DOCUMENT_PRESIGNED_URL_EXPIRES = env.int(
+    "DOCUMENT_PRESIGNED_URL_EXPIRES", default=60
+)
 
 # Culqi token
 CULQI_API_KEY = os.environ.get("CULQI_API_KEY")
+CULQI_BASE_URL = env("CULQI_BASE_URL", default="https://api.culqi.com/v2")
+# (connect, read) timeouts in seconds for the Culqi API
+CULQI_TIMEOUT = (
+    env.float("CULQI_CONNECT_TIMEOUT", default=3.05),
+    env.float("CULQI_READ_TIMEOUT", default=15),
+)
+CULQI_MAX_RETRIES = env.int("CULQI_MAX_RETRIES", default=3)
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -194,6 +222,12 @@ if not DEBUG:
             "LOCATION": "redis://{}:{}".format(REDIS_HOST, REDIS_PORT),
         }
     }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
 
 # Huey settings
 HUEY = {
@@ -211,6 +245,30 @@ HUEY = {
     },
 }
 
+# Embed every comment and reply in the post detail. Disable it once the
+# clients load the comments from the paginated thread API.
+FORUM_EMBED_COMMENTS = env.bool("FORUM_EMBED_COMMENTS", default=True)
+
+# Redis where the unread notification counters are kept and the new
+# notifications are published to the stream. Without it the counters are
+# read from the database and the stream is disabled.
+NOTIFICATION_REDIS_URL = env("NOTIFICATION_REDIS_URL", default=None)
+# Seconds a stream is kept open and between keep-alive comments, and the
+# milliseconds the clients wait to reconnect.
+NOTIFICATION_STREAM_MAX_DURATION = env.int(
+    "NOTIFICATION_STREAM_MAX_DURATION", default=300
+)
+NOTIFICATION_STREAM_HEARTBEAT = env.int(
+    "NOTIFICATION_STREAM_HEARTBEAT", default=15
+)
+NOTIFICATION_STREAM_RETRY = env.int("NOTIFICATION_STREAM_RETRY", default=3000)
+# Seconds the signed tokens to open the stream are valid. The stream renews
+# them at least every NOTIFICATION_STREAM_HEARTBEAT seconds, keep it longer
+# than that plus NOTIFICATION_STREAM_RETRY.
+NOTIFICATION_STREAM_TOKEN_MAX_AGE = env.int(
+    "NOTIFICATION_STREAM_TOKEN_MAX_AGE", default=60
+)
+
 RUNNING_TESTS = "test" in sys.argv
 
 if RUNNING_TESTS:
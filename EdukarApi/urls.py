@@ -28,4 +28,5 @@ urlpatterns = [
     path("store/", include("store.urls")),
     path("services/", include("services.urls")),
     path("webhooks/", include("webhooks.urls")),
+    path("search/", include("search.urls")),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
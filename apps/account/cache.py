@@ -0,0 +1,89 @@
+from account.models import Profile, UserProduct
+from django.core.cache import cache
+from django.db import transaction
+
+OWNED_PRODUCTS_TIMEOUT = 60 * 60 * 24
+AUTHOR_PICTURE_TIMEOUT = 60 * 60 * 24
+
+
+def get_owned_products_key(user_id):
+    return f"account:owned-products:{user_id}"
+
+
+def get_owned_product_ids(user):
+    """Return the ids of the products owned by the user."""
+    if not user.is_authenticated:
+        return frozenset()
+
+    key = get_owned_products_key(user.id)
+    product_ids = cache.get(key)
+    if product_ids is None:
+        product_ids = frozenset(
+            UserProduct.objects.filter(user=user).values_list(
+                "product_id", flat=True
+            )
+        )
+        cache.set(key, product_ids, OWNED_PRODUCTS_TIMEOUT)
+
+    return product_ids
+
+
+def invalidate_owned_products(user_id):
+    """
+    Remove the cached products of the user. It is done again on commit so a
+    request running in between does not cache the products of before the
+    transaction.
+    """
+    key = get_owned_products_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def get_author_picture_key(user_id):
+    return f"account:author-picture:{user_id}"
+
+
+def load_author_pictures(users):
+    """
+    Return a dict of user id -> picture URL of the given users. The pictures
+    are taken from a prefetched profile or from the cache, and the rest are
+    loaded with a single query.
+    """
+    pictures = {}
+    missing = {}
+    for user in users:
+        if user.pk in pictures:
+            continue
+
+        prefetched = getattr(user, "_prefetched_objects_cache", {})
+        if "profile" in prefetched:
+            profiles = prefetched["profile"]
+            pictures[user.pk] = profiles[0].picture.url if profiles else None
+        else:
+            missing[get_author_picture_key(user.pk)] = user.pk
+
+    if missing:
+        for key, url in cache.get_many(missing).items():
+            # Users without profile are cached as an empty string
+            pictures[missing.pop(key)] = url or None
+
+    if missing:
+        loaded = {}
+        profiles = Profile.objects.filter(user_id__in=missing.values())
+        for profile in profiles.order_by("pk"):
+            loaded.setdefault(profile.user_id, profile.picture.url)
+
+        cache.set_many(
+            {key: loaded.get(user_id, "") for key, user_id in missing.items()},
+            AUTHOR_PICTURE_TIMEOUT,
+        )
+        for user_id in missing.values():
+            pictures[user_id] = loaded.get(user_id)
+
+    return pictures
+
+
+def invalidate_author_picture(user_id):
+    key = get_author_picture_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.3 on 2026-10-17 23:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0007_userproduct'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userproduct',
+            index=models.Index(fields=['user', 'product'], name='account_use_user_id_d841ea_idx'),
+        ),
+    ]
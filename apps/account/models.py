@@ -38,6 +38,9 @@ class UserProduct(models.Model):
     )
     date = models.DateField(null=False, auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["user", "product"])]
+
     @classmethod
     def validate_product_purchase(cls, user: User, product: Product):
         """
@@ -1,6 +1,6 @@
 from rest_framework.permissions import BasePermission
 
-from .models import UserProduct
+from .cache import get_owned_product_ids
 
 
 class IsProductOwner(BasePermission):
@@ -9,7 +9,11 @@ class IsProductOwner(BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
+        # Load the products of the user only once per request
+        owned_product_ids = getattr(request, "_owned_product_ids", None)
+        if owned_product_ids is None:
+            owned_product_ids = get_owned_product_ids(request.user)
+            request._owned_product_ids = owned_product_ids
+
         # Check if the user has access to the specific product
-        return UserProduct.objects.filter(
-            user=request.user, product=obj
-        ).exists()
+        return obj.id in owned_product_ids
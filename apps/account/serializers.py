@@ -1,5 +1,7 @@
+from account.cache import load_author_pictures
 from account.models import Profile
 from django.contrib.auth.models import User
+from django.db.models import Manager
 from rest_framework import serializers
 
 
@@ -107,7 +109,7 @@ class UpdateUserProfileSerializer(serializers.ModelSerializer):
 
 
 class AuthorSerializer(serializers.ModelSerializer):
-    picture = serializers.CharField(source="profile.get.picture.url")
+    picture = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -116,6 +118,44 @@ class AuthorSerializer(serializers.ModelSerializer):
             "picture",
         )
 
+    def get_picture(self, obj):
+        pictures = self.context.get("author_pictures", {})
+        if obj.pk not in pictures:
+            pictures = prime_author_pictures(self.context, [obj])
+        return pictures[obj.pk]
+
+
+def prime_author_pictures(context, users):
+    """
+    Load at once the pictures of the given authors into the serializer
+    context, where AuthorSerializer looks for them before querying.
+    """
+    pictures = context.setdefault("author_pictures", {})
+    pending = [user for user in users if user and user.pk not in pictures]
+    if pending:
+        pictures.update(load_author_pictures(pending))
+    return pictures
+
+
+class AuthorCardListSerializer(serializers.ListSerializer):
+    """
+    List serializer of the models with an AuthorSerializer field, which
+    loads the pictures of all the authors of the list in one go.
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, Manager) else data)
+        sources = [
+            field.source
+            for field in self.child.fields.values()
+            if isinstance(field, AuthorSerializer)
+        ]
+        prime_author_pictures(
+            self.context,
+            [getattr(item, source) for item in items for source in sources],
+        )
+        return super().to_representation(items)
+
 
 # class UrlUserImageSerializer(serializers.ModelSerializer):
 #
@@ -1,10 +1,32 @@
 import logging
 
+from account.cache import invalidate_author_picture, invalidate_owned_products
+from account.models import Profile, UserProduct
+from core.cache import track_generation
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from djoser.signals import user_registered, user_activated
 
 logger = logging.getLogger(__name__)
 
+# Authors (username and picture) are rendered in cached responses, other
+# writes like sign-ups, activations or password changes don't affect them
+track_generation(User, fields=("username",))
+track_generation(Profile, fields=("user", "picture"))
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile_picture(sender, instance, **kwargs):
+    invalidate_author_picture(instance.user_id)
+
+
+@receiver(post_save, sender=UserProduct)
+@receiver(post_delete, sender=UserProduct)
+def invalidate_user_products(sender, instance, **kwargs):
+    invalidate_owned_products(instance.user_id)
+
 
 @receiver(user_registered)
 def handle_registration(sender, user, request, **kwargs):
@@ -3,21 +3,28 @@ import json
 import re
 from decimal import Decimal
 
+from account.cache import get_owned_product_ids, load_author_pictures
 from account.models import Profile, UserProduct
+from account.permissions import IsProductOwner
+from core.cache import get_generations
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core import mail
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
-from django.test import TestCase
+from django.test import RequestFactory, TestCase
 from django.urls import reverse
 from forum.models import Post, Section, Subsection
+from forum.serializers import PostResumeSerializer
 from PIL import Image
 from rest_framework import status
 from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
 from rest_framework.test import APIClient
 from store.models import Category, Product, Sell
 
 from helpers.choices import SellStatus
+from utils.products import assign_product_to_user
 
 # Create your tests here.
 
@@ -980,3 +987,129 @@ class TestUserPurchasesView(BaseSetup):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 0)
+
+
+class TestIsProductOwner(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.product = Product.objects.create(
+            name="Product 1", price=100, slug="product-1"
+        )
+        self.other_product = Product.objects.create(
+            name="Product 2", price=200, slug="product-2"
+        )
+        UserProduct.objects.create(user=self.user, product=self.product)
+
+    def get_request(self):
+        request = Request(RequestFactory().get("/"))
+        request.user = self.user
+        return request
+
+    def test_products_loaded_once_per_request(self):
+        permission = IsProductOwner()
+        request = self.get_request()
+
+        with self.assertNumQueries(1):
+            self.assertTrue(
+                permission.has_object_permission(request, None, self.product)
+            )
+            self.assertFalse(
+                permission.has_object_permission(
+                    request, None, self.other_product
+                )
+            )
+
+        # Next requests use the cached products
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                permission.has_object_permission(
+                    self.get_request(), None, self.product
+                )
+            )
+
+    def test_cache_invalidated_after_purchase(self):
+        self.assertEqual(get_owned_product_ids(self.user), {self.product.id})
+
+        sell = Sell.objects.create(
+            user=self.user, total_cost=200, status=SellStatus.FINISHED
+        )
+        sell.products.add(self.other_product)
+        assign_product_to_user(sell)
+
+        self.assertEqual(
+            get_owned_product_ids(self.user),
+            {self.product.id, self.other_product.id},
+        )
+
+
+class TestAuthorPictures(BaseSetup):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_pictures_loaded_once_per_list(self):
+        posts = Post.objects.select_related("author", "subsection")
+
+        # Posts and the pictures of both authors
+        with self.assertNumQueries(2):
+            data = PostResumeSerializer(posts, many=True).data
+
+        self.assertEqual(len(data), self.num_owner_posts * 2)
+        self.assertEqual(
+            data[0]["author"]["picture"], "/media/default-avatar.jpg"
+        )
+
+        # Next lists take the pictures from the cache
+        with self.assertNumQueries(1):
+            PostResumeSerializer(posts.all(), many=True).data
+
+    def test_cache_invalidated_after_profile_update(self):
+        load_author_pictures([self.user])
+
+        profile = self.user.profile.get()
+        profile.picture = "profile/testuser.webp"
+        profile.save()
+
+        pictures = load_author_pictures([self.user])
+        self.assertEqual(pictures[self.user.pk], "/media/profile/testuser.webp")
+
+    def test_user_without_profile(self):
+        user = User.objects.create_user(username="noprofile", password="test")
+
+        with self.assertNumQueries(1):
+            self.assertIsNone(load_author_pictures([user])[user.pk])
+        with self.assertNumQueries(0):
+            self.assertIsNone(load_author_pictures([user])[user.pk])
+
+
+class TestAuthorGenerations(BaseSetup):
+    def test_writes_not_rendered_keep_generations(self):
+        generations = get_generations(User, Profile)
+
+        user = User.objects.create_user(username="newuser", password="test")
+        Profile.objects.create(user=user)
+        user.is_active = False
+        user.save()
+        self.user.set_password("newpassword")
+        self.user.save()
+        self.client.login(username="testuser", password="newpassword")
+        profile = self.user.profile.get()
+        profile.about_me = "Nuevo"
+        profile.save()
+
+        self.assertEqual(get_generations(User, Profile), generations)
+
+    def test_rendered_fields_bump_generations(self):
+        generations = get_generations(User)
+        self.user.username = "renamed"
+        self.user.save()
+        self.assertNotEqual(get_generations(User), generations)
+
+        generations = get_generations(Profile)
+        profile = self.user2.profile.get()
+        profile.picture = "profile/testuser2.webp"
+        profile.save(update_fields=["picture"])
+        self.assertNotEqual(get_generations(Profile), generations)
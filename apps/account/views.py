@@ -4,14 +4,16 @@ from account.serializers import (
     UpdateUserProfileSerializer,
 )
 from core.paginators import CustomPagination
+from django.db.models import Prefetch
 from djoser.permissions import CurrentUserOrAdminOrReadOnly
 from forum.models import Post
 from forum.permissions import IsAuthorOrReadOnly
 from forum.serializers import PostResumeSerializer
+from notification.events import get_unread_count
 from rest_framework import generics, mixins, status, views, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from store.models import Category, Sell
+from store.models import Category, Product, Sell
 from store.serializers import PrivateProductSerializer, SellSerializer
 
 from helpers.choices import SellStatus
@@ -28,7 +30,7 @@ class UserByTokenAPIView(views.APIView):
                 "username": user.username,
                 "email": user.email,
                 "picture": user.profile.get().picture.url,
-                "has_notification": user.notif.filter(is_read=False).exists(),
+                "has_notification": get_unread_count(user.pk) > 0,
             }
         )
 
@@ -124,7 +126,11 @@ class UserPurchasesView(views.APIView):
         purchases = (
             Sell.objects.filter(user=request.user, status=SellStatus.FINISHED)
             .order_by("-paid_at")
-            .prefetch_related("products")
+            .prefetch_related(
+                Prefetch(
+                    "products", queryset=Product.objects.with_catalog_data()
+                )
+            )
         )
 
         # Serialize the purchase data
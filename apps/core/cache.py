@@ -0,0 +1,155 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from rest_framework.response import Response
+
+# Cached responses are invalidated by the generation counters, the timeout
+# only bounds how long unused entries are kept.
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_generation_key(model):
+    return f"generation:{model._meta.label_lower}"
+
+
+def get_generations(*models):
+    """Return the current generation of each model in a single round trip."""
+    keys = [get_generation_key(model) for model in models]
+    generations = cache.get_many(keys)
+
+    for key in keys:
+        if key not in generations:
+            # Start from the current time so that a counter lost by an
+            # eviction never goes back to a value used by older entries.
+            cache.add(key, time.time_ns() // 1000, None)
+            generations[key] = cache.get(key)
+
+    return [generations[key] for key in keys]
+
+
+def _incr_generation(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns() // 1000, None)
+
+
+def bump_generation(model):
+    key = get_generation_key(model)
+    _incr_generation(key)
+    # Bump it again once the data is committed, otherwise a response read
+    # before the commit could be cached with the new generation.
+    transaction.on_commit(lambda: _incr_generation(key))
+
+
+# Fields of the models tracked with ``fields``, by model
+_TRACKED_FIELDS = {}
+
+
+def _bump_sender_generation(sender, **kwargs):
+    bump_generation(sender)
+
+
+def _check_tracked_fields(sender, instance, raw, update_fields, **kwargs):
+    fields = _TRACKED_FIELDS[sender]
+    instance._tracked_fields_changed = False
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not fields.intersection(update_fields):
+        return
+
+    attnames = [sender._meta.get_field(name).attname for name in fields]
+    old = sender._default_manager.filter(pk=instance.pk).values(*attnames)
+    instance._tracked_fields_changed = not old or any(
+        old[0][attname] != getattr(instance, attname) for attname in attnames
+    )
+
+
+def _bump_changed_generation(sender, instance, **kwargs):
+    if getattr(instance, "_tracked_fields_changed", False):
+        bump_generation(sender)
+
+
+def _bump_m2m_generation(sender, instance, action, model, **kwargs):
+    if not action.startswith("post_"):
+        return
+    bump_generation(instance._meta.model)
+    bump_generation(model)
+
+
+def track_generation(*models, fields=None):
+    """
+    Bump the generation of the models on every save, delete or change of
+    their many to many relations. Call it from the ``ready`` of the app
+    so that writes made from any process (e.g. huey workers) are tracked.
+
+    With ``fields`` only the saves changing one of them are tracked, for
+    models of which the cached responses render a few fields. New rows are
+    then ignored too, as nothing rendered can reference them yet.
+    """
+    for model in models:
+        uid = f"track_generation:{model._meta.label_lower}"
+        if fields is None:
+            post_save.connect(
+                _bump_sender_generation, sender=model, dispatch_uid=uid
+            )
+        else:
+            _TRACKED_FIELDS[model] = frozenset(fields)
+            pre_save.connect(
+                _check_tracked_fields, sender=model, dispatch_uid=uid
+            )
+            post_save.connect(
+                _bump_changed_generation, sender=model, dispatch_uid=uid
+            )
+        post_delete.connect(
+            _bump_sender_generation, sender=model, dispatch_uid=uid
+        )
+
+        for field in model._meta.local_many_to_many:
+            m2m_changed.connect(
+                _bump_m2m_generation,
+                sender=field.remote_field.through,
+                dispatch_uid=uid,
+            )
+
+
+def cache_response(*models, timeout=RESPONSE_CACHE_TIMEOUT):
+    """
+    Cache the data of successful responses of a view method. The key is
+    built from the requested url and the generation of ``models``, so the
+    entry becomes stale as soon as one of them is written.
+    """
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            generations = ":".join(map(str, get_generations(*models)))
+            url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+            key = "response:{}.{}:{}:{}".format(
+                type(self).__module__,
+                view_method.__qualname__,
+                generations,
+                url,
+            )
+
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout)
+            return response
+
+        return wrapper
+
+    return decorator
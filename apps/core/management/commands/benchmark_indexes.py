@@ -0,0 +1,234 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from account.models import UserProduct
+from dashboard.models import DownloadExams
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from forum.models import Post, Section, Subsection
+from notification.models import Notification
+from services.models import Exams, University
+from store.models import Product, Sell
+
+from helpers.choices import SellStatus
+
+# Models whose Meta.indexes are compared
+INDEXED_MODELS = (
+    UserProduct,
+    Notification,
+    Sell,
+    Product,
+    Post,
+    DownloadExams,
+    Exams,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds realistic volumes and reports the plan and the time of the "
+        "main query of the hottest endpoints with and without the composite "
+        "indexes. Data is seeded inside a transaction that is rolled back at "
+        "the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--explain", action="store_true", help="Print the query plans"
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options["users"])
+            queries = self.get_queries()
+
+            after = self.run(queries, options)
+            self.drop_indexes()
+            before = self.run(queries, options)
+
+            self.stdout.write(
+                f"{'query':<24} {'before (ms)':>12} {'after (ms)':>11}"
+            )
+            for name in queries:
+                self.stdout.write(
+                    f"{name:<24} {before[name]:>12.3f} {after[name]:>11.3f}"
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, num_users):
+        self.stdout.write(f"Seeding data for {num_users} users...")
+        rand = random.Random(0)
+        now = timezone.now()
+        prefix = uuid.uuid4().hex[:8]
+
+        users = User.objects.bulk_create(
+            [User(username=f"bench-{prefix}-{i}") for i in range(num_users)]
+        )
+        products = Product.objects.bulk_create(
+            [
+                Product(
+                    name=f"bench {i}",
+                    slug=f"bench-{prefix}-{i}",
+                    price="10.00",
+                    show=rand.random() > 0.1,
+                )
+                for i in range(num_users)
+            ],
+            batch_size=1000,
+        )
+        UserProduct.objects.bulk_create(
+            [
+                UserProduct(user=user, product=product)
+                for user in users
+                for product in rand.sample(products, 10)
+            ],
+            batch_size=5000,
+        )
+        Notification.objects.bulk_create(
+            [
+                Notification(
+                    user=user,
+                    sender=rand.choice(users),
+                    date=now - timedelta(minutes=rand.randint(0, 10**6)),
+                    is_read=rand.random() > 0.05,
+                )
+                for user in users
+                for _ in range(50)
+            ],
+            batch_size=5000,
+        )
+        Sell.objects.bulk_create(
+            [
+                Sell(
+                    user=user,
+                    status=rand.choice(SellStatus.values),
+                    paid_at=now - timedelta(days=rand.randint(0, 700)),
+                    order_id=f"ord_{prefix}_{user.id}_{i}",
+                )
+                for user in users
+                for i in range(10)
+            ],
+            batch_size=5000,
+        )
+
+        section = Section.objects.create(name="bench", slug=f"bench-{prefix}")
+        subsections = [
+            Subsection.objects.create(
+                section=section, name=f"bench {i}", slug=f"bench-{prefix}-{i}"
+            )
+            for i in range(10)
+        ]
+        Post.objects.bulk_create(
+            [
+                Post(
+                    author=rand.choice(users),
+                    section=section,
+                    subsection=rand.choice(subsections),
+                    title=f"bench {i}",
+                    slug=f"bench-{prefix}-{i}",
+                    date=now - timedelta(minutes=rand.randint(0, 10**6)),
+                )
+                for i in range(num_users * 10)
+            ],
+            batch_size=5000,
+        )
+
+        universities = [
+            University.objects.create(name=f"bench {i}", siglas=f"B{i}")
+            for i in range(20)
+        ]
+        exams = Exams.objects.bulk_create(
+            [
+                Exams(
+                    university=rand.choice(universities),
+                    title=f"bench {i}",
+                    slug=f"bench-{prefix}-{i}",
+                    year=rand.randint(2000, 2024),
+                    source_exam=f"bench/{i}.pdf",
+                    is_delete=rand.random() < 0.2,
+                )
+                for i in range(num_users)
+            ],
+            batch_size=1000,
+        )
+        DownloadExams.objects.bulk_create(
+            [
+                DownloadExams(
+                    exam=rand.choice(exams),
+                    user=rand.choice(users),
+                    downloaded_at=now - timedelta(hours=rand.randint(0, 10**4)),
+                )
+                for _ in range(num_users * 25)
+            ],
+            batch_size=5000,
+        )
+
+        self.user = users[len(users) // 2]
+        self.product = products[len(products) // 2]
+        self.section = section
+        self.subsection = subsections[0]
+        self.university = universities[0]
+        self.order_id = f"ord_{prefix}_{self.user.id}_0"
+        self.analyze()
+
+    def get_queries(self):
+        since = timezone.now() - timedelta(days=7)
+        return {
+            "product owner": UserProduct.objects.filter(
+                user=self.user, product=self.product
+            ),
+            "unread notifications": Notification.objects.filter(
+                user=self.user, is_read=False
+            ),
+            "notifications list": Notification.objects.filter(
+                user=self.user, is_read=True
+            ).order_by("-date")[:10],
+            "user purchases": Sell.objects.filter(
+                user=self.user, status=SellStatus.FINISHED
+            ).order_by("-paid_at"),
+            "culqi webhook": Sell.objects.filter(order_id=self.order_id),
+            "catalog": Product.objects.filter(show=True).order_by("-id")[:10],
+            "forum subsection": Post.objects.filter(
+                section=self.section, subsection=self.subsection
+            ).order_by("-date")[:10],
+            "downloads last week": DownloadExams.objects.filter(
+                downloaded_at__gte=since
+            ),
+            "exams list": Exams.objects.filter(
+                is_delete=False, university=self.university, year=2020
+            ),
+        }
+
+    def run(self, queries, options):
+        timings = {}
+        for name, queryset in queries.items():
+            if options["explain"]:
+                self.stdout.write(f"-- {name}\n{queryset.explain()}\n")
+            timings[name] = self.measure(queryset, options["repeat"])
+        return timings
+
+    def measure(self, queryset, repeat):
+        """Return the best time in ms of the query."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
+
+    def drop_indexes(self):
+        with connection.schema_editor() as schema_editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    schema_editor.remove_index(model, index)
+        self.analyze()
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
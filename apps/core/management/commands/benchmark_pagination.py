@@ -0,0 +1,168 @@
+import time
+import uuid
+from datetime import timedelta
+from urllib import parse
+
+from core.paginators import CustomPagination, KeysetPagination
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from forum.models import Post, Section, Subsection
+from forum.views import PostAPIView
+from notification.models import Notification
+from notification.views import NotificationAPIView
+from rest_framework.pagination import Cursor
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from services.models import Exams, University
+from services.views import ExamsAPIView
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the time of the first and a deep page of the notifications, "
+        "posts and exams lists with page number and cursor pagination. Data "
+        "is seeded inside a transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page", type=int, default=1000)
+        parser.add_argument("--size", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        rows = options["page"] * options["size"]
+        with transaction.atomic():
+            self.seed(rows)
+            # Querysets with the ordering of the page number pagination
+            lists = {
+                "notifications": (
+                    Notification.objects.filter(user=self.user).order_by(
+                        "-date"
+                    ),
+                    NotificationAPIView(),
+                ),
+                "posts": (Post.objects.order_by("-date"), PostAPIView()),
+                "exams": (
+                    Exams.objects.filter(is_delete=False).order_by(
+                        "-year", "-id"
+                    ),
+                    ExamsAPIView(),
+                ),
+            }
+
+            self.stdout.write(
+                f"{'list':<15} {'pagination':<12} {'page 1 (ms)':>12} "
+                f"{'page ' + str(options['page']) + ' (ms)':>15}"
+            )
+            for name, (queryset, view) in lists.items():
+                for label, paginator_class in (
+                    ("page number", CustomPagination),
+                    ("cursor", KeysetPagination),
+                ):
+                    first, deep = (
+                        self.measure(
+                            paginator_class, queryset, view, page, options
+                        )
+                        for page in (1, options["page"])
+                    )
+                    self.stdout.write(
+                        f"{name:<15} {label:<12} {first:>12.3f} {deep:>15.3f}"
+                    )
+            transaction.set_rollback(True)
+
+    def seed(self, rows):
+        self.stdout.write(f"Seeding {rows} notifications, posts and exams...")
+        now = timezone.now()
+        prefix = uuid.uuid4().hex[:8]
+
+        self.user = User.objects.create(username=f"bench-{prefix}")
+        Notification.objects.bulk_create(
+            [
+                Notification(
+                    user=self.user,
+                    sender=self.user,
+                    date=now - timedelta(minutes=i),
+                )
+                for i in range(rows)
+            ],
+            batch_size=5000,
+        )
+
+        section = Section.objects.create(name="bench", slug=f"bench-{prefix}")
+        subsection = Subsection.objects.create(
+            section=section, name="bench", slug=f"bench-{prefix}"
+        )
+        Post.objects.bulk_create(
+            [
+                Post(
+                    author=self.user,
+                    section=section,
+                    subsection=subsection,
+                    title=f"bench {i}",
+                    slug=f"bench-{prefix}-{i}",
+                    date=now - timedelta(minutes=i),
+                )
+                for i in range(rows)
+            ],
+            batch_size=5000,
+        )
+
+        university = University.objects.create(name="bench", siglas="BENCH")
+        Exams.objects.bulk_create(
+            [
+                Exams(
+                    university=university,
+                    title=f"bench {i}",
+                    year=2000 + i % 25,
+                    slug=f"bench-{prefix}-{i}",
+                    cover="bench.png",
+                    source_exam="bench.pdf",
+                )
+                for i in range(rows)
+            ],
+            batch_size=5000,
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def get_params(self, paginator, queryset, view, page, size):
+        params = {"size": size}
+        if page == 1:
+            return params
+        if isinstance(paginator, CustomPagination):
+            return {**params, "page": page}
+
+        # Cursor pointing after the last row of the previous page, as the
+        # "next" link of that page would do
+        ordering = paginator.get_ordering(None, queryset, view)
+        field = ordering[0].lstrip("-")
+        position = queryset.order_by(*ordering).values_list(field, flat=True)[
+            (page - 1) * size - 1
+        ]
+        paginator.base_url = "/"
+        url = paginator.encode_cursor(
+            Cursor(offset=0, reverse=False, position=str(position))
+        )
+        cursor = parse.parse_qs(parse.urlparse(url).query)["cursor"][0]
+        return {**params, "cursor": cursor}
+
+    def measure(self, paginator_class, queryset, view, page, options):
+        """Return the best time in ms of paginating the queryset."""
+        paginator = paginator_class()
+        params = self.get_params(
+            paginator, queryset, view, page, options["size"]
+        )
+        request = Request(APIRequestFactory().get("/", params))
+
+        timings = []
+        for _ in range(options["repeat"]):
+            start = time.perf_counter()
+            results = paginator_class().paginate_queryset(
+                queryset, request, view
+            )
+            list(results)
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
@@ -1,7 +1,54 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 class CustomPagination(PageNumberPagination):
     page_size = 5
     page_size_query_param = 'size'
     max_page_size = 10
-    page_query_param = 'page'
\ No newline at end of file
+    page_query_param = 'page'
+
+class ThreadCursorPagination(CursorPagination):
+    """Comments and replies of a post, from the oldest to the newest."""
+    page_size = 10
+    page_size_query_param = 'size'
+    max_page_size = 50
+    ordering = 'pk'
+
+class KeysetPagination(CursorPagination):
+    """
+    Pagination of the lists scrolled infinitely in the app. Pages continue
+    from the last row seen instead of using an OFFSET and no COUNT is made,
+    so the last pages cost the same as the first one. The ordering is the
+    ``cursor_ordering`` of the view.
+    """
+    page_size = 5
+    page_size_query_param = 'size'
+    max_page_size = 10
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+
+        ordering = getattr(view, 'cursor_ordering', self.ordering)
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+class SelectablePaginationMixin:
+    """
+    Let the clients ask for ``?pagination=cursor`` to page the list with
+    KeysetPagination instead of the ``pagination_class`` of the view.
+    """
+    cursor_ordering = '-id'
+
+    def use_cursor_pagination(self):
+
+        return self.request.query_params.get('pagination') == 'cursor'
+
+    @property
+    def paginator(self):
+
+        if not hasattr(self, '_paginator'):
+            if self.use_cursor_pagination():
+                self._paginator = KeysetPagination()
+            else:
+                return super().paginator
+        return self._paginator
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.3 on 2026-10-17 23:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='downloadexams',
+            index=models.Index(fields=['downloaded_at'], name='dashboard_d_downloa_8b0ef4_idx'),
+        ),
+    ]
@@ -11,3 +11,6 @@ class DownloadExams(models.Model):
     downloaded_at = models.DateTimeField(default=timezone.now)
     user = models.ForeignKey(User, null=True, on_delete=models.SET_NULL)
     download_successful = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["downloaded_at"])]
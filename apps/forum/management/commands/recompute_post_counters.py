@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from forum.models import Post
+
+class Command(BaseCommand):
+    help = 'Recomputes the comment and reply counters and the last activity of the posts'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            'post_ids', nargs='*', type=int,
+            help='Posts to recompute, all of them by default')
+
+    def handle(self, *args, **options):
+
+        post_ids = options['post_ids'] or None
+        updated = Post.recompute_counters(post_ids)
+        self.stdout.write('{0} posts recomputed'.format(updated))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from forum.models import Post
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search document of the posts (Postgres only)'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            'post_ids', nargs='*', type=int,
+            help='Posts to rebuild, all of them by default')
+
+    def handle(self, *args, **options):
+
+        post_ids = options['post_ids'] or None
+        updated = Post.update_search_vector(post_ids)
+        self.stdout.write('{0} posts updated'.format(updated))
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.3 on 2026-10-17 23:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0012_alter_comment_image_alter_post_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['section', 'subsection', '-date'], name='forum_post_section_6bb872_idx'),
+        ),
+    ]
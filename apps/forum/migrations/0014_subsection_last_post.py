@@ -0,0 +1,30 @@
+# Generated by Django 4.0.3 on 2026-10-17 23:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_last_post(apps, schema_editor):
+    Post = apps.get_model('forum', 'Post')
+    Subsection = apps.get_model('forum', 'Subsection')
+
+    latest_post = Post.objects.filter(
+        section=models.OuterRef('section'),
+        subsection=models.OuterRef('pk'),
+    ).order_by('-date', '-pk').values('pk')[:1]
+    Subsection.objects.update(last_post=models.Subquery(latest_post))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0013_post_forum_post_section_6bb872_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subsection',
+            name='last_post',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='forum.post'),
+        ),
+        migrations.RunPython(set_last_post, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.0.3 on 2026-10-17 23:36
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Greatest
+import django.utils.timezone
+
+
+def set_post_counters(apps, schema_editor):
+    Post = apps.get_model('forum', 'Post')
+    Comment = apps.get_model('forum', 'Comment')
+    Reply = apps.get_model('forum', 'Reply')
+
+    comments = Comment.objects.filter(
+        post=models.OuterRef('pk')).order_by().values('post')
+    replies = Reply.objects.filter(
+        comment__post=models.OuterRef('pk')).order_by().values('comment__post')
+
+    def subquery(queryset, aggregate, default):
+        return Coalesce(
+            models.Subquery(queryset.annotate(value=aggregate).values('value')),
+            default)
+
+    Post.objects.update(
+        comment_count=subquery(comments, models.Count('pk'), 0),
+        reply_count=subquery(replies, models.Count('pk'), 0),
+        last_activity_at=Greatest(
+            'date',
+            subquery(comments, models.Max('date'), models.F('date')),
+            subquery(replies, models.Max('date'), models.F('date')),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0014_subsection_last_post'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(set_post_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.0.3 on 2026-10-17 23:43
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def create_search_config(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'unaccent'")
+        has_unaccent = cursor.fetchone() is not None
+
+    schema_editor.execute(
+        'CREATE TEXT SEARCH CONFIGURATION spanish_unaccent (COPY = spanish)')
+
+    # Without the extension the configuration is just spanish
+    if has_unaccent:
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+        schema_editor.execute(
+            'ALTER TEXT SEARCH CONFIGURATION spanish_unaccent '
+            'ALTER MAPPING FOR hword, hword_part, word '
+            'WITH unaccent, spanish_stem')
+
+
+def drop_search_config(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute(
+        'DROP TEXT SEARCH CONFIGURATION IF EXISTS spanish_unaccent')
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    Post = apps.get_model('forum', 'Post')
+    Post.objects.update(search_vector=(
+        SearchVector('title', weight='A', config='spanish_unaccent')
+        + SearchVector('body', weight='B', config='spanish_unaccent')
+    ))
+    schema_editor.execute(
+        'CREATE INDEX forum_post_search_idx ON forum_post '
+        'USING gin (search_vector)')
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('DROP INDEX IF EXISTS forum_post_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0015_post_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_config, drop_search_config),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
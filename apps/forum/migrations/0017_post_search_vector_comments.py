@@ -0,0 +1,34 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+
+def add_comments_to_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    Post = apps.get_model('forum', 'Post')
+    Comment = apps.get_model('forum', 'Comment')
+    comments = Comment.objects.filter(
+        post=models.OuterRef('pk')
+    ).values('post').annotate(
+        text=StringAgg('body', ' ', output_field=models.TextField())
+    ).values('text')
+    Post.objects.update(search_vector=(
+        SearchVector('title', weight='A', config='spanish_unaccent')
+        + SearchVector('body', weight='B', config='spanish_unaccent')
+        + SearchVector(
+            models.Subquery(comments), weight='C', config='spanish_unaccent')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0016_post_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            add_comments_to_search_vector, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,17 @@
 from django.contrib.auth.models import User
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank, SearchVector, SearchVectorField)
 # from django.core.files.storage import default_storage as storage
-from django.db import models
+from django.db import connections, models
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 from uuid import uuid4
 # from utils.image import image_resize
 from django_resized import ResizedImageField
 
+from helpers.constants import SEARCH_CONFIG
+
 # Create your models here.
 
 class BaseContentPublication(models.Model):
@@ -76,11 +82,52 @@ class Subsection(models.Model):
     section = models.ForeignKey(Section, on_delete=models.CASCADE, related_name='subsection')
     name = models.CharField(max_length=50)
     slug = models.SlugField(max_length=60, null=True, blank=True, unique=True)
+    # Most recent post, shown in the forum home. Kept by the post signals.
+    last_post = models.ForeignKey(
+        'Post', null=True, blank=True, editable=False,
+        on_delete=models.SET_NULL, related_name='+')
 
     def __str__(self):
 
         return self.name
 
+    @classmethod
+    def update_last_post(cls, subsection_ids):
+        """Point the given subsections to their most recent post."""
+
+        latest_post = Post.objects.filter(
+            section=models.OuterRef('section'),
+            subsection=models.OuterRef('pk')
+        ).order_by('-date', '-pk').values('pk')[:1]
+
+        cls.objects.filter(pk__in=subsection_ids).update(
+            last_post=models.Subquery(latest_post))
+
+class PostQuerySet(models.QuerySet):
+
+    def search(self, text):
+        """
+        Posts matching the text in their title, body or comments, the most
+        relevant first and with the matching fragment of the body as
+        ``headline``. Databases other than Postgres just look for the text in
+        the title, body and comments.
+        """
+
+        if connections[self.db].vendor != 'postgresql':
+            return self.filter(
+                models.Q(title__icontains=text) | models.Q(body__icontains=text)
+                | models.Q(comments__body__icontains=text)
+            ).distinct().order_by('-date')
+
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        return self.filter(search_vector=query).annotate(
+            rank=SearchRank('search_vector', query),
+            headline=SearchHeadline(
+                'body', query, config=SEARCH_CONFIG,
+                start_sel='<mark>', stop_sel='</mark>',
+                min_words=15, max_words=35),
+        ).order_by('-rank', '-date')
+
 class Post(BaseContentPublication):
 
     section = models.ForeignKey(Section, on_delete=models.CASCADE, related_name='posts')
@@ -88,11 +135,82 @@ class Post(BaseContentPublication):
     title = models.CharField(max_length=100)
     slug = models.SlugField(max_length=100, null=True, blank=True, unique=True)
     participants = models.ManyToManyField(User, related_name='participants')
+    # Counters kept by the comment and reply signals
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
+    last_activity_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Title, body and comments search document, kept by the post and comment
+    # signals on Postgres.
+    # Its GIN index is created in the migration, SQLite does not support it.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=['section', 'subsection', '-date'])]
 
     def __str__(self):
 
         return self.title
 
+    @classmethod
+    def recompute_counters(cls, post_ids=None):
+        """
+        Recompute the comment and reply counters and the last activity of
+        the posts from their comments and replies.
+        """
+
+        comments = Comment.objects.filter(
+            post=models.OuterRef('pk')).order_by().values('post')
+        replies = Reply.objects.filter(
+            comment__post=models.OuterRef('pk')).order_by().values('comment__post')
+
+        def subquery(queryset, aggregate, default):
+            return Coalesce(
+                models.Subquery(queryset.annotate(value=aggregate).values('value')),
+                default)
+
+        queryset = cls.objects.all()
+        if post_ids is not None:
+            queryset = queryset.filter(pk__in=post_ids)
+
+        return queryset.update(
+            comment_count=subquery(comments, models.Count('pk'), 0),
+            reply_count=subquery(replies, models.Count('pk'), 0),
+            last_activity_at=Greatest(
+                'date',
+                subquery(comments, models.Max('date'), models.F('date')),
+                subquery(replies, models.Max('date'), models.F('date')),
+            )
+        )
+
+    @classmethod
+    def update_search_vector(cls, post_ids=None):
+        """
+        Rebuild the search document of the posts from their title, body and
+        the bodies of their comments (with less weight).
+        """
+
+        queryset = cls.objects.all()
+        if connections[queryset.db].vendor != 'postgresql':
+            return 0
+
+        if post_ids is not None:
+            queryset = queryset.filter(pk__in=post_ids)
+
+        comments = Comment.objects.filter(
+            post=models.OuterRef('pk')
+        ).values('post').annotate(
+            text=StringAgg('body', ' ', output_field=models.TextField())
+        ).values('text')
+
+        return queryset.update(search_vector=(
+            SearchVector('title', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('body', weight='B', config=SEARCH_CONFIG)
+            + SearchVector(
+                models.Subquery(comments), weight='C', config=SEARCH_CONFIG)
+        ))
+
 class Comment(BaseContentPublication):
 
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
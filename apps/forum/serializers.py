@@ -1,5 +1,4 @@
-from account.serializers import AuthorSerializer
-from django.core.exceptions import ObjectDoesNotExist
+from account.serializers import AuthorCardListSerializer, AuthorSerializer
 from forum.models import Comment, Post, Reply, Section, Subsection
 from rest_framework import serializers
 
@@ -14,20 +13,12 @@ class LastPostResumeSerializer(serializers.ModelSerializer):
 
 
 class SubsectionResumeSerializer(serializers.ModelSerializer):
-    last_post = serializers.SerializerMethodField()
+    last_post = LastPostResumeSerializer(read_only=True)
 
     class Meta:
         model = Subsection
         fields = ("id", "name", "slug", "last_post")
 
-    def get_last_post(self, obj):
-        try:
-            post = obj.posts.latest("date")
-            serializer = LastPostResumeSerializer(post)
-            return serializer.data
-        except ObjectDoesNotExist:
-            return
-
 
 class SectionResumeSerializer(serializers.ModelSerializer):
     subsections = SubsectionResumeSerializer(
@@ -43,10 +34,11 @@ class SectionResumeSerializer(serializers.ModelSerializer):
 class PostResumeSerializer(serializers.ModelSerializer):
     author = AuthorSerializer(read_only=True)
     subsection = serializers.CharField(source="subsection.name")
-    num_comments = serializers.SerializerMethodField()
+    num_comments = serializers.IntegerField(source="comment_count")
 
     class Meta:
         model = Post
+        list_serializer_class = AuthorCardListSerializer
         fields = (
             "title",
             "slug",
@@ -56,9 +48,6 @@ class PostResumeSerializer(serializers.ModelSerializer):
             "num_comments",
         )
 
-    def get_num_comments(self, obj):
-        return obj.comments.all().count()
-
 
 ########### Serializer for section and subsection ###########
 class SubsectionSerializer(serializers.ModelSerializer):
@@ -90,7 +79,7 @@ class CreatePostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
         read_only_fields = ("slug",)
-        exclude = ("id", "date", "participants")
+        exclude = ("id", "date", "participants", "search_vector")
         extra_kwargs = {
             "body": {"write_only": True},
             "title": {"write_only": True},
@@ -149,6 +138,7 @@ class ReplySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Reply
+        list_serializer_class = AuthorCardListSerializer
         exclude = ("comment",)
 
 
@@ -161,11 +151,12 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Comment
+        list_serializer_class = AuthorCardListSerializer
         exclude = ("post",)
 
     def get_replies(self, instance):
         replies = instance.replies.all().order_by("pk")
-        return ReplySerializer(replies, many=True).data
+        return ReplySerializer(replies, many=True, context=self.context).data
 
 
 class PostSerializer(serializers.ModelSerializer):
@@ -176,17 +167,41 @@ class PostSerializer(serializers.ModelSerializer):
     comments = serializers.SerializerMethodField()
     time = serializers.CharField(source="time_difference")
     image = serializers.SerializerMethodField()
+    # Matching fragment of the body, only in search results
+    headline = serializers.CharField(read_only=True)
 
     class Meta:
         model = Post
-        exclude = ("participants",)
+        list_serializer_class = AuthorCardListSerializer
+        exclude = ("participants", "search_vector")
 
     def get_comments(self, instance):
         comments = instance.comments.all().order_by("pk")
-        return CommentSerializer(comments, many=True).data
+        return CommentSerializer(comments, many=True, context=self.context).data
 
     def get_image(self, instance):
         image = instance.image
         if image:
             return image.url
         return None
+
+
+########### Serializers for the paginated comment threads ###########
+class PostThreadSerializer(PostSerializer):
+    """Post detail without its comments, loaded from the thread API."""
+
+    comments = None
+
+
+class ThreadCommentSerializer(CommentSerializer):
+    """
+    Comment with the first replies attached by the thread view and the URL
+    to load the rest of them.
+    """
+
+    more_replies = serializers.CharField(read_only=True)
+
+    def get_replies(self, instance):
+        return ReplySerializer(
+            instance.preview_replies, many=True, context=self.context
+        ).data
@@ -1,18 +1,24 @@
 import random
 import string
 
-from django.db.models.signals import pre_save, post_save
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.utils.text import slugify
 
 from helpers.messages import CommentForumNotification, ReplyForumNotification
 from helpers.constants import POST_PATH
 
+from core.cache import track_generation
 from notification.models import Notification
 from notification.tasks import notify_users
 from forum.models import Post, Section, Subsection, Comment, Reply
 
 
+track_generation(Section, Subsection, Post)
+
+
 @receiver(post_save, sender=Post)
 def signal_after_post_create(sender, created, instance, **kwargs):
 
@@ -35,6 +41,47 @@ def signal_after_post_create(sender, created, instance, **kwargs):
     instance.participants.add(instance.author)
 
 
+@receiver(pre_save, sender=Post)
+def save_previous_subsection(sender, instance, **kwargs):
+
+    # The post may be moved to another subsection whose last post changes too
+    instance._previous_subsection_id = None
+    if instance.pk:
+        instance._previous_subsection_id = Post.objects.filter(
+            pk=instance.pk).values_list('subsection_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def update_subsection_last_post(sender, instance, **kwargs):
+
+    subsection_ids = {instance.subsection_id}
+    previous_subsection_id = getattr(instance, '_previous_subsection_id', None)
+    if previous_subsection_id:
+        subsection_ids.add(previous_subsection_id)
+
+    Subsection.update_last_post(subsection_ids)
+
+
+@receiver(post_save, sender=Post)
+def update_post_search_vector(sender, instance, update_fields=None, **kwargs):
+
+    if update_fields and not {'title', 'body'} & set(update_fields):
+        return
+
+    Post.update_search_vector([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def update_post_search_vector_comments(sender, instance, update_fields=None, **kwargs):
+
+    if update_fields and 'body' not in update_fields:
+        return
+
+    Post.update_search_vector([instance.post_id])
+
+
 @receiver(pre_save, sender=Section)
 def create_section_slug(sender, instance, **kwargs):
 
@@ -107,3 +154,39 @@ def send_notification_reply(sender, instance, created, **kwargs):
     )
 
     notify_users(notification, source)
+
+
+@receiver(post_save, sender=Comment)
+def increase_comment_count(sender, instance, created, **kwargs):
+
+    if not created:
+        return
+
+    Post.objects.filter(pk=instance.post_id).update(
+        comment_count=F('comment_count') + 1,
+        last_activity_at=Greatest('last_activity_at', Value(instance.date)))
+
+
+@receiver(post_delete, sender=Comment)
+def decrease_comment_count(sender, instance, **kwargs):
+
+    Post.objects.filter(pk=instance.post_id).update(
+        comment_count=Greatest(F('comment_count') - 1, 0))
+
+
+@receiver(post_save, sender=Reply)
+def increase_reply_count(sender, instance, created, **kwargs):
+
+    if not created:
+        return
+
+    Post.objects.filter(comments=instance.comment_id).update(
+        reply_count=F('reply_count') + 1,
+        last_activity_at=Greatest('last_activity_at', Value(instance.date)))
+
+
+@receiver(post_delete, sender=Reply)
+def decrease_reply_count(sender, instance, **kwargs):
+
+    Post.objects.filter(comments=instance.comment_id).update(
+        reply_count=Greatest(F('reply_count') - 1, 0))
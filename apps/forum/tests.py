@@ -1,10 +1,16 @@
+import io
 import json
+from unittest import skipUnless
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.text import slugify
 
 from rest_framework import status
@@ -839,6 +845,51 @@ class TestForumHome(BaseSetup):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(json_res[0]['subsections'][0]['last_post'])
 
+    def test_home_forum_num_queries(self):
+        for i in range(5):
+            section = Section.objects.create(name='Section ' + str(i))
+            for j in range(3):
+                subsection = Subsection.objects.create(
+                    section=section, name='Sub {} {}'.format(i, j))
+                Post.objects.create(
+                    author=self.user,
+                    section=section,
+                    subsection=subsection,
+                    **self.post_form)
+
+        client = APIClient()
+        # Sections and subsections with their last post and author
+        with self.assertNumQueries(2):
+            response = client.get(reverse('forum:home-forum'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 6)
+
+    def test_last_post_follows_new_and_deleted_posts(self):
+        last_post = Post.objects.latest('date')
+        other_subsection = Subsection.objects.create(
+            section=self.section, name='Otra')
+
+        new_post = Post.objects.create(
+            author=self.user,
+            section=self.section,
+            subsection=self.subsection,
+            **self.post_form)
+        self.subsection.refresh_from_db()
+        self.assertEqual(self.subsection.last_post, new_post)
+
+        # Moving the post updates both subsections
+        new_post.subsection = other_subsection
+        new_post.save()
+        self.subsection.refresh_from_db()
+        other_subsection.refresh_from_db()
+        self.assertEqual(self.subsection.last_post, last_post)
+        self.assertEqual(other_subsection.last_post, new_post)
+
+        new_post.delete()
+        other_subsection.refresh_from_db()
+        self.assertIsNone(other_subsection.last_post)
+
     def test_get_all_subsection(self):
 
         num_new_subsections = 5
@@ -913,3 +964,271 @@ class TestForumHome(BaseSetup):
 
         # No number value in course we expect to return an empty dictionary
         self.assertEqual(len(json_data['results']), 0)
+
+
+class TestPostCounters(BaseSetup):
+
+    def setUp(self):
+        super(TestPostCounters, self).setUp()
+
+        self.post = Post.objects.create(
+            author=self.user,
+            section=self.section,
+            subsection=self.subsection,
+            title='Test title',
+            body='<p> test text </p>',
+            date=timezone.now() - timezone.timedelta(days=1))
+
+    def test_counters_follow_comments_and_replies(self):
+
+        comment = Comment.objects.create(author=self.user, post=self.post, body='a')
+        Comment.objects.create(author=self.user, post=self.post, body='b')
+        reply = Reply.objects.create(author=self.user, comment=comment, body='c')
+        Reply.objects.create(author=self.user, comment=comment, body='d')
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(self.post.reply_count, 2)
+        self.assertGreaterEqual(self.post.last_activity_at, reply.date)
+
+        # Deleting a comment also deletes its replies
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.post.reply_count, 0)
+
+    def test_num_comments_in_post_list(self):
+
+        Comment.objects.create(author=self.user, post=self.post, body='a')
+
+        client = APIClient()
+        url = reverse('forum:sections-post', kwargs={'slug': self.section.slug})
+        response = client.get(url, {'subsection': '0'})
+        json_res = json.loads(response.content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json_res['results'][0]['num_comments'], 1)
+
+    def test_recompute_counters_command(self):
+
+        comment = Comment.objects.create(author=self.user, post=self.post, body='a')
+        reply = Reply.objects.create(author=self.user, comment=comment, body='b')
+        Post.objects.filter(pk=self.post.pk).update(
+            comment_count=10, reply_count=10, last_activity_at=self.post.date)
+
+        call_command('recompute_post_counters', stdout=io.StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.post.reply_count, 1)
+        self.assertEqual(self.post.last_activity_at, reply.date)
+
+
+class TestCommentThread(BaseSetup):
+
+    def setUp(self):
+        super(TestCommentThread, self).setUp()
+
+        self.post = Post.objects.create(
+            author=self.user,
+            section=self.section,
+            subsection=self.subsection,
+            title='Test title',
+            body='<p> test text </p>')
+        self.post.refresh_from_db()
+
+    def create_comments(self, num_comments, num_replies):
+
+        for i in range(num_comments):
+            comment = Comment.objects.create(
+                author=self.user, post=self.post, body='comment ' + str(i))
+            for j in range(num_replies):
+                Reply.objects.create(
+                    author=self.user, comment=comment, body='reply ' + str(j))
+
+    def get_thread(self, **params):
+
+        client = APIClient()
+        url = reverse('forum:posts-comments', kwargs={'slug': self.post.slug})
+        return client.get(url, params)
+
+    def test_thread_pages_and_reply_previews(self):
+
+        self.create_comments(12, 5)
+
+        response = self.get_thread()
+        json_res = json.loads(response.content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(json_res['results']), 10)
+        self.assertTrue(json_res['next'])
+        first_comment = json_res['results'][0]
+        self.assertEqual(first_comment['body'], 'comment 0')
+        self.assertEqual(
+            [reply['body'] for reply in first_comment['replies']],
+            ['reply 0', 'reply 1', 'reply 2'])
+
+        # The rest of the replies are loaded from the "more" cursor
+        client = APIClient()
+        more = json.loads(client.get(first_comment['more_replies']).content)
+        self.assertEqual(
+            [reply['body'] for reply in more['results']], ['reply 3', 'reply 4'])
+
+        next_page = json.loads(client.get(json_res['next']).content)
+        self.assertEqual(len(next_page['results']), 2)
+
+    def test_thread_without_more_replies(self):
+
+        self.create_comments(1, 3)
+
+        json_res = json.loads(self.get_thread().content)
+
+        self.assertEqual(len(json_res['results'][0]['replies']), 3)
+        self.assertIsNone(json_res['results'][0]['more_replies'])
+
+    def test_thread_num_queries_is_constant(self):
+
+        self.create_comments(2, 1)
+        cache.clear()
+        with CaptureQueriesContext(connection) as few:
+            self.get_thread()
+
+        self.create_comments(10, 6)
+        cache.clear()
+        with CaptureQueriesContext(connection) as many:
+            self.get_thread(size=12)
+
+        self.assertEqual(len(few), len(many))
+
+    def test_post_detail_without_embedded_comments(self):
+
+        self.create_comments(2, 1)
+        client = APIClient()
+        url = reverse('forum:posts-detail', kwargs={'slug': self.post.slug})
+
+        embedded = json.loads(client.get(url).content)
+        with self.settings(FORUM_EMBED_COMMENTS=False):
+            detail = json.loads(client.get(url).content)
+
+        self.assertEqual(len(embedded['comments']), 2)
+        self.assertNotIn('comments', detail)
+        self.assertEqual(detail['comment_count'], 2)
+        self.assertEqual(detail['reply_count'], 2)
+
+
+class TestPostSearch(BaseSetup):
+
+    def setUp(self):
+        super(TestPostSearch, self).setUp()
+
+        def create_post(title, body):
+            return Post.objects.create(
+                author=self.user, section=self.section,
+                subsection=self.subsection, title=title, body=body)
+
+        self.in_body = create_post(
+            'Dudas del examen', '<p>No entiendo las ecuaciones cuadráticas</p>')
+        self.in_title = create_post(
+            'Ecuaciones cuadráticas', '<p>Ayuda con la tarea</p>')
+        self.other = create_post('Geometría', '<p>Triángulos semejantes</p>')
+
+    def search(self, q):
+        client = APIClient()
+        response = client.get(reverse('forum:posts-list'), {'q': q})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)
+
+    def test_search_title_and_body(self):
+
+        json_res = self.search('cuadráticas')
+        slugs = {post['slug'] for post in json_res['results']}
+
+        self.assertEqual(json_res['count'], 2)
+        self.assertEqual(slugs, {self.in_body.slug, self.in_title.slug})
+
+    @skipUnless(connection.vendor == 'postgresql', 'Requires Postgres')
+    def test_search_ranked_with_headline(self):
+
+        json_res = self.search('ecuación cuadrática')
+        results = json_res['results']
+
+        # Stemmed words, matches in the title come first
+        self.assertEqual(
+            [post['slug'] for post in results],
+            [self.in_title.slug, self.in_body.slug])
+        self.assertIn('<mark>', results[1]['headline'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Requires Postgres')
+    def test_search_vector_follows_post_updates(self):
+
+        self.in_title.title = 'Inecuaciones'
+        self.in_title.body = '<p>Intervalos</p>'
+        self.in_title.save()
+
+        self.assertEqual(self.search('intervalos')['count'], 1)
+        self.assertEqual(self.search('cuadráticas')['count'], 1)
+
+    def test_search_vector_follows_comments(self):
+
+        comment = Comment.objects.create(
+            author=self.user, post=self.other,
+            body='<p>Usa las ecuaciones cuadráticas</p>')
+
+        slugs = [post['slug'] for post in self.search('cuadráticas')['results']]
+        self.assertEqual(len(slugs), 3)
+        if connection.vendor == 'postgresql':
+            # The comments weigh less than the title and body
+            self.other.refresh_from_db()
+            self.assertRegex(self.other.search_vector, r':\d+C')
+
+        comment.delete()
+        self.assertEqual(self.search('cuadráticas')['count'], 2)
+
+    def test_list_without_search_has_no_headline(self):
+
+        json_res = self.search('')
+        self.assertEqual(json_res['count'], 3)
+        self.assertNotIn('headline', json_res['results'][0])
+        self.assertNotIn('search_vector', json_res['results'][0])
+
+
+class TestPostCursorPagination(BaseSetup):
+
+    def setUp(self):
+        super(TestPostCursorPagination, self).setUp()
+
+        for i in range(7):
+            Post.objects.create(
+                author=self.user, section=self.section,
+                subsection=self.subsection, title=f'Post {i}', body='<p>text</p>')
+        # Same date for some of them, the id breaks the tie
+        Post.objects.filter(title__in=['Post 2', 'Post 3', 'Post 4']).update(
+            date=Post.objects.get(title='Post 2').date)
+
+    def get_all_pages(self, url, params):
+
+        client = APIClient()
+        res = client.get(url, {'pagination': 'cursor', 'size': 2, **params})
+
+        slugs = []
+        while True:
+            json_res = json.loads(res.content)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', json_res)
+            slugs += [post['slug'] for post in json_res['results']]
+            if json_res['next'] is None:
+                return slugs
+            res = client.get(json_res['next'])
+
+    def test_posts_with_cursor_pagination(self):
+
+        expected = list(
+            Post.objects.order_by('-date', '-id').values_list('slug', flat=True))
+
+        self.assertEqual(
+            self.get_all_pages(reverse('forum:posts-list'), {}), expected)
+        self.assertEqual(
+            self.get_all_pages(
+                reverse('forum:sections-post', args=[self.section.slug]),
+                {'subsection': '0'}),
+            expected)
@@ -1,12 +1,20 @@
 from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import OuterRef, Prefetch, Subquery
+from django.urls import reverse
 from rest_framework import generics, status, viewsets, mixins
+from rest_framework.decorators import action
+from rest_framework.pagination import Cursor
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.exceptions import ValidationError
 
-from forum.models import Post, Comment, Reply, Section
+from account.serializers import prime_author_pictures
+from forum.models import Post, Comment, Reply, Section, Subsection
 from forum.permissions import IsAuthorOrReadOnly
-from core.paginators import CustomPagination
+from core.cache import cache_response
+from core.paginators import (
+    CustomPagination, SelectablePaginationMixin, ThreadCursorPagination)
 from forum.serializers import (
     CommentCreateSerializer,
     CommentSerializer,
@@ -16,6 +24,8 @@ from forum.serializers import (
     PostResumeSerializer,
     SectionSerializer,
     PostSerializer,
+    PostThreadSerializer,
+    ThreadCommentSerializer,
     CreatePostSerializer,
     UpdatePostSerializer,
     ReplyCreateSerializer,
@@ -26,19 +36,66 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Number of replies sent with each comment of a thread
+REPLIES_PREVIEW_SIZE = 3
+
 # Create your views here.
 
 
+def attach_reply_previews(request, comments):
+    """
+    Attach the first replies of each comment in one query, plus the URL to
+    load the next replies when there are more of them.
+    """
+
+    first_replies = Reply.objects.filter(
+        comment=OuterRef('comment')
+    ).order_by('pk').values('pk')[:REPLIES_PREVIEW_SIZE + 1]
+    replies = Reply.objects.filter(
+        comment__in=comments, pk__in=Subquery(first_replies)
+    ).select_related('author').order_by('pk')
+
+    replies_by_comment = {}
+    for reply in replies:
+        replies_by_comment.setdefault(reply.comment_id, []).append(reply)
+
+    for comment in comments:
+        comment_replies = replies_by_comment.get(comment.pk, [])
+        comment.preview_replies = comment_replies[:REPLIES_PREVIEW_SIZE]
+        comment.more_replies = None
+
+        if len(comment_replies) > REPLIES_PREVIEW_SIZE:
+            paginator = ThreadCursorPagination()
+            paginator.base_url = request.build_absolute_uri(
+                reverse('forum:comments-replies', args=[comment.pk]))
+            last_reply = comment.preview_replies[-1]
+            comment.more_replies = paginator.encode_cursor(
+                Cursor(offset=0, reverse=False, position=str(last_reply.pk)))
+
+
 class ForumHomeAPIView(generics.ListAPIView):
 
     serializer_class = SectionResumeSerializer
-    queryset = Section.objects.all()
+    # Sections, then subsections joined with their last post and its author
+    queryset = Section.objects.prefetch_related(
+        Prefetch(
+            'subsection',
+            queryset=Subsection.objects.select_related('last_post__author')
+        )
+    )
 
+    # The last post date is shown relative to now ("Hace 5 minutos"), so the
+    # cached home is also refreshed every minute.
+    @cache_response(Section, Subsection, Post, User, timeout=60)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
-class SectionPostAPIView(generics.ListAPIView):
+
+class SectionPostAPIView(SelectablePaginationMixin, generics.ListAPIView):
 
     serializer_class = PostResumeSerializer
     pagination_class = CustomPagination
+    cursor_ordering = ('-date', '-id')
     lookup_url_kwarg = "slug"
 
     def get_queryset(self):
@@ -67,25 +124,26 @@ class SectionAPIView(generics.ListAPIView):
     queryset = Section.objects.all().order_by('id')
 
 
-class PostAPIView(viewsets.ModelViewSet):
+class PostAPIView(SelectablePaginationMixin, viewsets.ModelViewSet):
 
     # queryset = Post.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly,)
     lookup_field = 'slug'
     pagination_class = CustomPagination
+    cursor_ordering = ('-date', '-id')
 
     def get_queryset(self):
 
-        queryset = Post.objects.all()
+        queryset = Post.objects.order_by('-date')
 
-        # TODO: Add test to check if this works
         q = self.request.query_params.get('q')
         username = self.request.query_params.get('username')
         section = self.request.query_params.get('section')
         subsection = self.request.query_params.get('subsection')
 
+        # Ranked full-text search, replaces the ordering by date
         if q:
-            queryset = queryset.filter(title__icontains=q)
+            queryset = queryset.search(q)
 
         if username:
             queryset = queryset.filter(author__username=username)
@@ -96,7 +154,14 @@ class PostAPIView(viewsets.ModelViewSet):
         if subsection:
             queryset = queryset.filter(subsection_id=subsection)
 
-        return queryset.order_by('-date')
+        return queryset
+
+    def use_cursor_pagination(self):
+
+        # Search results are ordered by rank, not by date
+        return (
+            self.action == 'list' and not self.request.query_params.get('q')
+            and super().use_cursor_pagination())
 
     def get_throttles(self):
         if self.action == 'create' and not settings.DEBUG:
@@ -110,7 +175,11 @@ class PostAPIView(viewsets.ModelViewSet):
         if self.action == 'create':
             return CreatePostSerializer
         elif self.action == 'retrieve' or self.action == 'list':
-            return PostSerializer
+            if settings.FORUM_EMBED_COMMENTS:
+                return PostSerializer
+            return PostThreadSerializer
+        elif self.action == 'comments':
+            return ThreadCommentSerializer
         elif (self.action == 'update') | (self.action == 'partial_update'):
             return UpdatePostSerializer
 
@@ -156,6 +225,27 @@ class PostAPIView(viewsets.ModelViewSet):
         instance_serializer = PostSerializer(new_instance)
         return Response(instance_serializer.data)
 
+    @action(detail=True, methods=['get'], pagination_class=ThreadCursorPagination)
+    def comments(self, request, slug=None):
+        """Comments of the post by pages, each one with its first replies."""
+
+        post = self.get_object()
+        queryset = post.comments.select_related('author')
+
+        comments = self.paginate_queryset(queryset)
+        attach_reply_previews(request, comments)
+
+        # Load the pictures of the comments and replies authors at once
+        context = self.get_serializer_context()
+        prime_author_pictures(context, [
+            author
+            for comment in comments
+            for author in [comment.author] + [
+                reply.author for reply in comment.preview_replies]
+        ])
+        serializer = self.get_serializer(comments, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
+
 
 class CommentAPIView(
     mixins.CreateModelMixin,
@@ -168,6 +258,17 @@ class CommentAPIView(
     serializer_class = CommentCreateSerializer
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly,)
 
+    @action(detail=True, methods=['get'], pagination_class=ThreadCursorPagination)
+    def replies(self, request, pk=None):
+        """Replies of the comment by pages."""
+
+        comment = self.get_object()
+        queryset = comment.replies.select_related('author')
+
+        replies = self.paginate_queryset(queryset)
+        serializer = ReplySerializer(replies, many=True)
+        return self.get_paginated_response(serializer.data)
+
     # def get_serializer_class(self):
     #
     #     if self.action == 'create':
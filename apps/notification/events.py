@@ -0,0 +1,194 @@
+import json
+import logging
+import threading
+import time
+
+import redis
+from django.conf import settings
+from django.db import connection
+
+from notification.authentication import make_stream_token
+from notification.models import Notification
+from notification.serializers import NotificationSerializer
+
+logger = logging.getLogger(__name__)
+
+# The counters are recomputed from the database when they expire
+UNREAD_COUNT_TIMEOUT = 60 * 60 * 24
+# Increment the counter only if it exists, otherwise INCR would start it
+# from 0 and miss the notifications created before
+INCR_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCR', KEYS[1])
+end
+return nil
+"""
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis():
+    """
+    Redis client shared by the process, None when NOTIFICATION_REDIS_URL is
+    not set. Without it the unread notifications are read from the database.
+    """
+    global _client
+
+    if not settings.NOTIFICATION_REDIS_URL:
+        return None
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = redis.Redis.from_url(
+                    settings.NOTIFICATION_REDIS_URL, decode_responses=True)
+    return _client
+
+
+def get_unread_key(user_id):
+    return f'notification:unread:{user_id}'
+
+
+def get_channel(user_id):
+    return f'notification:user:{user_id}'
+
+
+def count_unread(user_id):
+    return Notification.objects.filter(user_id=user_id, is_read=False).count()
+
+
+def get_unread_count(user_id):
+    """Unread notifications of the user, from Redis when it is available."""
+
+    client = get_redis()
+    if client is None:
+        return count_unread(user_id)
+
+    try:
+        count = client.get(get_unread_key(user_id))
+        if count is not None:
+            return int(count)
+        return refresh_unread_count(user_id, client)
+    except redis.RedisError:
+        logger.warning(
+            f'Notification no se pudo leer el contador de user_id {user_id}',
+            exc_info=True)
+        return count_unread(user_id)
+
+
+def refresh_unread_count(user_id, client):
+    count = count_unread(user_id)
+    client.set(get_unread_key(user_id), count, ex=UNREAD_COUNT_TIMEOUT)
+    return count
+
+
+def publish(user_id, event, client):
+    client.publish(get_channel(user_id), json.dumps(event))
+
+
+def notification_created(notification):
+    """Increase the counter of the receiver and push the notification."""
+
+    client = get_redis()
+    if client is None:
+        return
+
+    user_id = notification.user_id
+    try:
+        count = client.eval(INCR_IF_EXISTS, 1, get_unread_key(user_id))
+        if count is None:
+            count = refresh_unread_count(user_id, client)
+        publish(user_id, {
+            'type': 'notification',
+            'unread': int(count),
+            'notification': NotificationSerializer(notification).data,
+        }, client)
+    except redis.RedisError:
+        logger.warning(
+            'Notification no se pudo publicar la notificacion '
+            f'{notification.pk} de user_id {user_id}', exc_info=True)
+
+
+def unread_changed(user_id):
+    """
+    Recompute the counter after notifications are read or deleted, push it
+    and return it.
+    """
+
+    client = get_redis()
+    if client is None:
+        return count_unread(user_id)
+
+    try:
+        count = refresh_unread_count(user_id, client)
+        publish(user_id, {'type': 'unread', 'unread': count}, client)
+        return count
+    except redis.RedisError:
+        logger.warning(
+            f'Notification no se pudo actualizar el contador de user_id {user_id}',
+            exc_info=True)
+        return count_unread(user_id)
+
+
+def format_event(event, event_id=None, retry=None):
+    lines = []
+    if retry is not None:
+        lines.append(f'retry: {retry}')
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event["type"]}')
+    lines.append(f'data: {json.dumps(event)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def format_heartbeat(event_id):
+    # Only a comment and the id, no event is dispatched to the client
+    return f'id: {event_id}\n: keep-alive\n\n'
+
+
+def event_stream(user_id):
+    """
+    Server-sent events of the user: the unread counter when the stream
+    opens and then the events published for the user. The stream ends after
+    NOTIFICATION_STREAM_MAX_DURATION seconds, the clients reconnect.
+
+    The id of the messages is a fresh stream token. EventSource sends the
+    last one in the Last-Event-ID header when it reconnects to the same
+    URL, whose token may have already expired.
+    """
+
+    pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+    try:
+        # Subscribe before reading the counter so no event is missed
+        pubsub.subscribe(get_channel(user_id))
+        unread = get_unread_count(user_id)
+        yield format_event(
+            {'type': 'unread', 'unread': unread},
+            event_id=make_stream_token(user_id),
+            retry=settings.NOTIFICATION_STREAM_RETRY)
+
+        # Don't keep a database connection for every open stream
+        if not connection.in_atomic_block:
+            connection.close()
+
+        deadline = time.monotonic() + settings.NOTIFICATION_STREAM_MAX_DURATION
+        while time.monotonic() < deadline:
+            message = pubsub.get_message(
+                timeout=settings.NOTIFICATION_STREAM_HEARTBEAT)
+            if message is None:
+                # Comment line, keeps the proxies from closing the stream
+                yield format_heartbeat(make_stream_token(user_id))
+            else:
+                yield format_event(
+                    json.loads(message['data']),
+                    event_id=make_stream_token(user_id))
+
+        # Latest token for the reconnection
+        yield format_heartbeat(make_stream_token(user_id))
+    except redis.RedisError:
+        logger.warning(
+            f'Notification stream interrumpido de user_id {user_id}',
+            exc_info=True)
+    finally:
+        pubsub.close()
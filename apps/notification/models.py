@@ -27,6 +27,17 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     source_path = models.CharField(max_length=255, null=False, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_read', '-date']),
+            # Unread notifications of a user, the most frequent lookup
+            models.Index(
+                fields=['user'],
+                condition=models.Q(is_read=False),
+                name='notif_user_unread_idx',
+            ),
+        ]
+
     def __str__(self):
 
         format_str = f'{self.title} | {self.user}'
@@ -0,0 +1,23 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from notification.events import notification_created, unread_changed
+from notification.models import Notification
+
+
+@receiver(post_save, sender=Notification)
+def push_notification(sender, instance, created, **kwargs):
+
+    # Pushed once committed so the clients can already load it
+    if created:
+        transaction.on_commit(lambda: notification_created(instance))
+    else:
+        transaction.on_commit(lambda: unread_changed(instance.user_id))
+
+
+@receiver(post_delete, sender=Notification)
+def push_unread_after_delete(sender, instance, **kwargs):
+
+    # Also covers the admin and the cascades of the users
+    transaction.on_commit(lambda: unread_changed(instance.user_id))
@@ -1,14 +1,19 @@
 import json
+import re
+import time
+from unittest.mock import MagicMock, patch
 
+import redis
 from django.contrib.auth.models import User
 #from django.core import mail
 from django.core.exceptions import ObjectDoesNotExist
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 from rest_framework.authtoken.models import Token
+from notification.authentication import make_stream_token
 from notification.models import Notification
 
 # from notification.models import NotificationTypes
@@ -184,6 +189,27 @@ class TestNotificationUsers(BaseNotificationTestSetup):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(self.num_comments, json_res['count'])
 
+    def test_get_notification_with_cursor_pagination(self):
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + self.access_post_owner)
+        url = reverse('notification:notification-user-list')
+        res = client.get(url, {'pagination': 'cursor', 'size': 2})
+
+        ids = []
+        while True:
+            json_res = json.loads(res.content)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', json_res)
+            ids += [notif['id'] for notif in json_res['results']]
+            if json_res['next'] is None:
+                break
+            res = client.get(json_res['next'])
+
+        expected = Notification.objects.filter(
+            user=self.user_post_owner).order_by('-date', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+
     def test_deleted_notification_success(self):
 
         # Get notification
@@ -351,3 +377,196 @@ class TestCheckNotification(BaseNotificationTestSetup):
         )
         json_res = json.loads(res.content)
         self.assertEqual({'key': 'Este campo es requerido'}, json_res)
+
+
+@override_settings(NOTIFICATION_REDIS_URL='redis://localhost:6379/0')
+class TestNotificationStream(BaseNotificationTestSetup):
+
+    def setUp(self):
+        super().setUp()
+
+        self.redis = MagicMock()
+        patcher = patch('notification.events._client', self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_comment(self):
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(author=self.user, body='text', post=self.post)
+
+    def get_published_events(self):
+
+        return [
+            (call.args[0], json.loads(call.args[1]))
+            for call in self.redis.publish.call_args_list
+        ]
+
+    def test_new_notification_increases_counter_and_is_published(self):
+
+        self.redis.eval.return_value = 2
+        self.create_comment()
+
+        channel, event = self.get_published_events()[0]
+        self.assertEqual(channel, f'notification:user:{self.user_post_owner.pk}')
+        self.assertEqual(event['type'], 'notification')
+        self.assertEqual(event['unread'], 2)
+        self.assertEqual(event['notification']['sender'], self.user.username)
+
+    def test_missing_counter_is_recomputed(self):
+
+        self.redis.eval.return_value = None
+        self.create_comment()
+
+        key = f'notification:unread:{self.user_post_owner.pk}'
+        self.assertEqual(self.redis.set.call_args.args, (key, 1))
+        self.assertEqual(self.get_published_events()[0][1]['unread'], 1)
+
+    def test_read_notifications_publish_counter(self):
+
+        self.create_comment()
+        notif = Notification.objects.get(user=self.user_post_owner)
+        self.redis.publish.reset_mock()
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + self.access_post_owner)
+        res = client.post(
+            reverse('notification:notification-user-set-read'),
+            {'selected_notifications': [notif.pk]},
+            format='json'
+        )
+
+        self.assertFalse(json.loads(res.content)['has_notification'])
+        self.assertEqual(
+            self.get_published_events(),
+            [(f'notification:user:{self.user_post_owner.pk}',
+              {'type': 'unread', 'unread': 0})])
+
+    def test_counter_follows_any_update_or_delete(self):
+
+        self.create_comment()
+        notif = Notification.objects.get(user=self.user_post_owner)
+        self.redis.publish.reset_mock()
+
+        # e.g. from the admin
+        notif.is_read = True
+        with self.captureOnCommitCallbacks(execute=True):
+            notif.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            notif.delete()
+
+        channel = f'notification:user:{self.user_post_owner.pk}'
+        self.assertEqual(
+            self.get_published_events(),
+            [(channel, {'type': 'unread', 'unread': 0})] * 2)
+
+    def test_check_notification_reads_counter(self):
+
+        self.redis.get.return_value = '3'
+
+        client = APIClient()
+        with self.assertNumQueries(1):  # Only the token lookup
+            res = client.post(
+                reverse('notification:check-notification'),
+                {'key': self.access_post_owner}
+            )
+        self.assertTrue(json.loads(res.content)['has_notification'])
+
+    def test_stream_events(self):
+
+        pubsub = self.redis.pubsub.return_value
+        pubsub.get_message.side_effect = [
+            None,
+            {'data': json.dumps({'type': 'unread', 'unread': 0})},
+            redis.ConnectionError(),
+        ]
+        self.redis.get.return_value = '1'
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + self.access_post_owner)
+        token = client.post(
+            reverse('notification:notification-stream-token')).data['token']
+        client.credentials()
+        res = client.get(
+            reverse('notification:notification-stream'),
+            {'token': token},
+            HTTP_ACCEPT='text/event-stream'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/event-stream')
+
+        events = res.streaming_content
+        first = next(events).decode()
+        self.assertIn('event: unread', first)
+        self.assertIn('"unread": 1', first)
+        self.assertTrue(next(events).decode().endswith(': keep-alive\n\n'))
+        self.assertIn('"unread": 0', next(events).decode())
+
+        # The stream ends when the connection to Redis is lost
+        self.assertEqual(list(events), [])
+        pubsub.subscribe.assert_called_once_with(
+            f'notification:user:{self.user_post_owner.pk}')
+        pubsub.close.assert_called_once()
+
+    def test_stream_requires_authentication(self):
+
+        client = APIClient()
+        res = client.get(
+            reverse('notification:notification-stream'),
+            HTTP_ACCEPT='text/event-stream'
+        )
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stream_rejects_permanent_and_expired_tokens(self):
+
+        client = APIClient()
+        url = reverse('notification:notification-stream')
+        res = client.get(
+            url, {'token': self.access_post_owner},
+            HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        token = make_stream_token(self.user_post_owner.pk)
+        with override_settings(NOTIFICATION_STREAM_TOKEN_MAX_AGE=-1):
+            res = client.get(
+                url, {'token': token}, HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(NOTIFICATION_STREAM_MAX_DURATION=0)
+    def test_stream_reconnects_with_same_url_after_timeout(self):
+
+        self.redis.get.return_value = '0'
+        now = time.time()
+        token = make_stream_token(self.user_post_owner.pk)
+
+        client = APIClient()
+        url = reverse('notification:notification-stream')
+        res = client.get(url, {'token': token}, HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        # The stream is read until it times out
+        with patch('django.core.signing.time') as signing_time:
+            signing_time.time.return_value = now + 300
+            events = b''.join(res.streaming_content).decode()
+        last_event_id = re.findall(r'^id: (.+)$', events, re.MULTILINE)[-1]
+
+        # EventSource reconnects to the same URL after the retry delay
+        with patch('django.core.signing.time') as signing_time:
+            signing_time.time.return_value = now + 303
+            res = client.get(
+                url, {'token': token}, HTTP_ACCEPT='text/event-stream',
+                HTTP_LAST_EVENT_ID=last_event_id)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+            # The token of the URL alone already expired
+            res = client.get(
+                url, {'token': token}, HTTP_ACCEPT='text/event-stream')
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(NOTIFICATION_REDIS_URL=None)
+    def test_stream_disabled_without_redis(self):
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + self.access_post_owner)
+        res = client.get(reverse('notification:notification-stream'))
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -9,6 +9,8 @@ router.register(r'notification-user', views.NotificationAPIView, basename='notif
 app_name = 'notification'
 urlpatterns = [
     path('check-notification/', views.CheckNotificationAPIView.as_view(), name='check-notification'),
+    path('stream-token/', views.NotificationStreamTokenAPIView.as_view(), name='notification-stream-token'),
+    path('stream/', views.NotificationStreamAPIView.as_view(), name='notification-stream'),
 ]
 
 urlpatterns += router.urls
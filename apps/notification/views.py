@@ -1,13 +1,22 @@
 from rest_framework.views import APIView
 from rest_framework import status, viewsets, mixins
+from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.http import StreamingHttpResponse
 
-from core.paginators import CustomPagination
+from core.paginators import CustomPagination, SelectablePaginationMixin
+from notification.authentication import (
+    StreamTokenAuthentication, make_stream_token)
+from notification.events import (
+    event_stream, get_redis, get_unread_count, unread_changed)
 from notification.models import Notification
+from notification.renderers import EventStreamRenderer
 from notification.serializers import (
     NotificationSerializer,
     # NotificationSenderSerializer,
@@ -18,6 +27,7 @@ from notification.serializers import (
 # Create your views here.
 
 class NotificationAPIView(
+    SelectablePaginationMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
     viewsets.GenericViewSet):
@@ -25,6 +35,7 @@ class NotificationAPIView(
     serializer_class = NotificationSerializer
     permission_classes = (IsAuthenticated,) #, isOwnNotification)
     pagination_class = CustomPagination
+    cursor_ordering = ('-date', '-id')
 
     def get_queryset(self):
 
@@ -51,7 +62,9 @@ class NotificationAPIView(
             user=request.user
         )
         notifications.update(is_read=True)
-        return Response({'has_notification': request.user.notif.filter(is_read=False).exists()})
+        # update() sends no signals, the counter is recomputed here
+        unread = unread_changed(request.user.pk)
+        return Response({'has_notification': unread > 0})
         # if serializer.is_valid():
 
 
@@ -98,10 +111,54 @@ class CheckNotificationAPIView(APIView):
     def post(self, request, format=None):
 
         try:
-            user = Token.objects.get(key=request.data['key']).user
-            has_notification = Notification.objects.filter(user=user, is_read=False).exists()
+            user_id = Token.objects.values_list('user_id', flat=True).get(
+                key=request.data['key'])
+            has_notification = get_unread_count(user_id) > 0
             return Response({'has_notification': has_notification}, status=status.HTTP_200_OK)
         except ObjectDoesNotExist:
             return Response({'token_error': 'El token no existe'}, status=status.HTTP_400_BAD_REQUEST)
         except KeyError:
             return Response({'key': 'Este campo es requerido'}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class NotificationStreamTokenAPIView(APIView):
+    """
+    Short-lived token to open the stream. The automatic reconnections of
+    EventSource are authenticated with the tokens sent by the stream, a new
+    one is only needed to open the stream again by hand.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, format=None):
+
+        return Response({
+            'token': make_stream_token(request.user.pk),
+            'expires_in': settings.NOTIFICATION_STREAM_TOKEN_MAX_AGE
+        })
+
+
+class NotificationStreamAPIView(APIView):
+    """
+    Server-sent events with the unread notifications of the user, replaces
+    polling ``check-notification``. EventSource can not send headers so the
+    token from ``stream-token`` may also be sent in the ``token`` query param.
+    """
+
+    authentication_classes = (TokenAuthentication, StreamTokenAuthentication)
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (JSONRenderer, EventStreamRenderer)
+
+    def get(self, request, format=None):
+
+        if get_redis() is None:
+            return Response(
+                {'detail': 'Las notificaciones en tiempo real no están disponibles'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        response = StreamingHttpResponse(
+            event_stream(request.user.pk), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Don't let nginx buffer the events
+        response['X-Accel-Buffering'] = 'no'
+        return response
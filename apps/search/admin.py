@@ -0,0 +1,13 @@
+from django.contrib import admin
+from search.models import SearchDocument
+
+# Register your models here.
+
+
+class SearchDocumentAdmin(admin.ModelAdmin):
+    list_display = ("title", "type", "object_id")
+    list_filter = ("type",)
+    search_fields = ("title",)
+
+
+admin.site.register(SearchDocument, SearchDocumentAdmin)
@@ -0,0 +1,139 @@
+from django.db import transaction
+from forum.models import Post
+from search.models import SearchDocument
+from services.models import Course, Exams
+from store.models import Product
+
+from helpers.choices import SearchTypes
+from helpers.constants import POST_PATH
+
+
+def product_document(product):
+    if not product.show:
+        return None
+    return {
+        "title": product.name,
+        "body": product.description,
+        "slug": product.slug,
+    }
+
+
+def exam_document(exam):
+    if exam.is_delete:
+        return None
+    university = exam.university.name if exam.university else ""
+    details = [university, exam.type, exam.area, str(exam.year)]
+    return {
+        "title": exam.title,
+        "body": " ".join(detail for detail in details if detail),
+        "slug": exam.slug,
+    }
+
+
+def course_document(course):
+    return {"title": course.name, "url": course.url}
+
+
+def post_document(post):
+    return {
+        "title": post.title,
+        "body": post.body,
+        "slug": post.slug or "",
+        "url": POST_PATH.format(post.section.slug, post.slug),
+    }
+
+
+# Model -> (type of its documents, builder, related objects used by it).
+# A builder returns None when the object must not be found by the search.
+DOCUMENT_SOURCES = {
+    Product: (SearchTypes.PRODUCT, product_document, ()),
+    Exams: (SearchTypes.EXAM, exam_document, ("university",)),
+    Course: (SearchTypes.COURSE, course_document, ()),
+    Post: (SearchTypes.POST, post_document, ("section",)),
+}
+
+
+def update_document(instance):
+    """Create, update or remove the search document of the instance."""
+    search_type, build, _ = DOCUMENT_SOURCES[type(instance)]
+    data = build(instance)
+
+    if data is None:
+        delete_document(instance)
+        return
+
+    document, _ = SearchDocument.objects.update_or_create(
+        type=search_type, object_id=instance.pk, defaults=data
+    )
+    SearchDocument.update_search_vector([document.pk])
+
+
+def get_related_models():
+    """Models whose objects are used to build the documents of others."""
+    return {
+        model._meta.get_field(name).related_model
+        for model, (_, _, related) in DOCUMENT_SOURCES.items()
+        for name in related
+    }
+
+
+def update_related_documents(instance):
+    """
+    Recompute the documents built from the instance as a related object,
+    e.g. the posts of a renamed section whose urls contain its slug.
+    """
+    for model, (search_type, build, related) in DOCUMENT_SOURCES.items():
+        for name in related:
+            if model._meta.get_field(name).related_model is not type(instance):
+                continue
+
+            queryset = model.objects.filter(**{name: instance})
+            with transaction.atomic():
+                documents = SearchDocument.objects.filter(
+                    type=search_type, object_id__in=queryset.values("pk")
+                )
+                documents.delete()
+                SearchDocument.objects.bulk_create(
+                    build_documents(
+                        search_type, build, queryset.select_related(*related)
+                    ),
+                    batch_size=1000,
+                )
+                SearchDocument.update_search_vector(documents.values("pk"))
+
+
+def build_documents(search_type, build, queryset):
+    documents = []
+    for instance in queryset.order_by("pk").iterator():
+        data = build(instance)
+        if data is not None:
+            documents.append(
+                SearchDocument(type=search_type, object_id=instance.pk, **data)
+            )
+    return documents
+
+
+def delete_document(instance):
+    search_type = DOCUMENT_SOURCES[type(instance)][0]
+    SearchDocument.objects.filter(
+        type=search_type, object_id=instance.pk
+    ).delete()
+
+
+def rebuild_documents(types=None):
+    """Recompute the documents of the given types (all if None)."""
+    count = 0
+    with transaction.atomic():
+        for model, (search_type, build, related) in DOCUMENT_SOURCES.items():
+            if types is not None and search_type not in types:
+                continue
+
+            documents = build_documents(
+                search_type, build, model.objects.select_related(*related)
+            )
+            SearchDocument.objects.filter(type=search_type).delete()
+            SearchDocument.objects.bulk_create(documents, batch_size=1000)
+            count += len(documents)
+
+        SearchDocument.update_search_vector()
+    return count
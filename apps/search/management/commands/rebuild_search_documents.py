@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from search.documents import rebuild_documents
+
+from helpers.choices import SearchTypes
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the documents of the search API from their models"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "types",
+            nargs="*",
+            help="Types of documents to rebuild ({}), all of them by "
+            "default".format(", ".join(SearchTypes.values)),
+        )
+
+    def handle(self, *args, **options):
+        types = options["types"]
+        invalid = set(types) - set(SearchTypes.values)
+        if invalid:
+            raise CommandError(f"Invalid types: {', '.join(sorted(invalid))}")
+
+        count = rebuild_documents(types or None)
+        self.stdout.write(f"{count} documents rebuilt")
@@ -0,0 +1,84 @@
+# Generated by Django 4.0.3 on 2026-10-17 23:46
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+
+def build_search_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    Product = apps.get_model('store', 'Product')
+    Exams = apps.get_model('services', 'Exams')
+    Course = apps.get_model('services', 'Course')
+    Post = apps.get_model('forum', 'Post')
+
+    documents = [
+        SearchDocument(
+            type='product', object_id=product.pk, title=product.name,
+            body=product.description, slug=product.slug)
+        for product in Product.objects.filter(show=True).iterator()
+    ]
+    for exam in Exams.objects.filter(
+            is_delete=False).select_related('university').iterator():
+        university = exam.university.name if exam.university else ''
+        details = [university, exam.type, exam.area, str(exam.year)]
+        documents.append(SearchDocument(
+            type='exam', object_id=exam.pk, title=exam.title,
+            body=' '.join(detail for detail in details if detail),
+            slug=exam.slug))
+    documents += [
+        SearchDocument(
+            type='course', object_id=course.pk, title=course.name,
+            url=course.url)
+        for course in Course.objects.iterator()
+    ]
+    documents += [
+        SearchDocument(
+            type='post', object_id=post.pk, title=post.title, body=post.body,
+            slug=post.slug or '',
+            url=f'/forum/{post.section.slug}/posts/{post.slug}/')
+        for post in Post.objects.select_related('section').iterator()
+    ]
+    SearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    SearchDocument.objects.update(search_vector=(
+        SearchVector('title', weight='A', config='spanish_unaccent')
+        + SearchVector('body', weight='B', config='spanish_unaccent')
+    ))
+    schema_editor.execute(
+        'CREATE INDEX search_document_vector_idx ON search_searchdocument '
+        'USING gin (search_vector)')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('forum', '0016_post_search_vector'),
+        ('services', '0014_exams_exams_active_univ_year_idx'),
+        ('store', '0020_product_store_produ_show_c94a70_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('product', 'Producto'), ('exam', 'Examen'), ('course', 'Curso'), ('post', 'Publicación del foro')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('slug', models.CharField(blank=True, max_length=255)),
+                ('url', models.CharField(blank=True, max_length=255)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+            ],
+            options={
+                'unique_together': {('type', 'object_id')},
+            },
+        ),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+)
+from django.db import connections, models
+
+from helpers.choices import SearchTypes
+from helpers.constants import SEARCH_CONFIG
+
+
+class SearchDocumentQuerySet(models.QuerySet):
+    def search(self, text):
+        """
+        Documents matching the text, the most relevant first and with the
+        matching fragment of the body as ``headline``. Databases other than
+        Postgres just look for the text in the title and body.
+        """
+        if connections[self.db].vendor != "postgresql":
+            return self.filter(
+                models.Q(title__icontains=text) | models.Q(body__icontains=text)
+            ).order_by("-id")
+
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+        return (
+            self.filter(search_vector=query)
+            .annotate(
+                rank=SearchRank("search_vector", query),
+                headline=SearchHeadline(
+                    "body",
+                    query,
+                    config=SEARCH_CONFIG,
+                    start_sel="<mark>",
+                    stop_sel="</mark>",
+                    min_words=15,
+                    max_words=35,
+                ),
+            )
+            .order_by("-rank", "-id")
+        )
+
+
+class SearchDocument(models.Model):
+    """
+    Searchable copy of the products, exams, courses and forum posts. It is
+    kept in sync by the search signals so the search API looks up a single
+    table instead of one per model.
+    """
+
+    type = models.CharField(max_length=20, choices=SearchTypes.choices)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    slug = models.CharField(max_length=255, blank=True)
+    url = models.CharField(max_length=255, blank=True)
+    # Its GIN index is created in the migration, SQLite does not support it
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = SearchDocumentQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ("type", "object_id")
+
+    def __str__(self):
+        return f"{self.type} - {self.title}"
+
+    @classmethod
+    def update_search_vector(cls, document_ids=None):
+        """Rebuild the search vector of the documents (all if None)."""
+        queryset = cls.objects.all()
+        if connections[queryset.db].vendor != "postgresql":
+            return 0
+
+        if document_ids is not None:
+            queryset = queryset.filter(pk__in=document_ids)
+
+        return queryset.update(
+            search_vector=(
+                SearchVector("title", weight="A", config=SEARCH_CONFIG)
+                + SearchVector("body", weight="B", config=SEARCH_CONFIG)
+            )
+        )
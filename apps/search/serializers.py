@@ -0,0 +1,12 @@
+from rest_framework import serializers
+from search.models import SearchDocument
+
+
+class SearchDocumentSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source="object_id")
+    # Matching fragment of the body, only with the Postgres search
+    headline = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = SearchDocument
+        fields = ("type", "id", "title", "slug", "url", "headline")
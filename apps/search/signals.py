@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save
+from search.documents import (
+    DOCUMENT_SOURCES,
+    delete_document,
+    get_related_models,
+    update_document,
+    update_related_documents,
+)
+
+
+def _update_sender_document(sender, instance, **kwargs):
+    update_document(instance)
+
+
+def _delete_sender_document(sender, instance, **kwargs):
+    delete_document(instance)
+
+
+def _update_related_documents(sender, instance, created, **kwargs):
+    # Nothing can be built from a new object yet
+    if not created:
+        update_related_documents(instance)
+
+
+for model in DOCUMENT_SOURCES:
+    uid = f"search_document:{model._meta.label_lower}"
+    post_save.connect(_update_sender_document, sender=model, dispatch_uid=uid)
+    post_delete.connect(_delete_sender_document, sender=model, dispatch_uid=uid)
+
+# e.g. the section slug in the urls of the posts
+for model in get_related_models():
+    uid = f"search_related_documents:{model._meta.label_lower}"
+    post_save.connect(_update_related_documents, sender=model, dispatch_uid=uid)
@@ -0,0 +1,143 @@
+import io
+import json
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from forum.models import Post, Section, Subsection
+from rest_framework import status
+from rest_framework.test import APIClient
+from search.models import SearchDocument
+from services.models import Course, Exams, University
+from store.models import Product
+
+from helpers.choices import SearchTypes
+
+# Create your tests here.
+
+
+class TestSearch(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="testuser", password="test")
+        section = Section.objects.create(name="Cursos")
+        subsection = Subsection.objects.create(section=section, name="Álgebra")
+        university = University.objects.create(
+            name="Universidad",
+            siglas="UN",
+            exam_types=["Ordinario"],
+            exam_areas=["Ingeniería"],
+        )
+
+        self.product = Product.objects.create(
+            name="Separata de álgebra",
+            slug="separata-de-algebra",
+            description="Ejercicios resueltos de ecuaciones",
+            price=10,
+        )
+        self.exam = Exams.objects.create(
+            university=university,
+            title="Examen de admisión",
+            type="Ordinario",
+            area="Ingeniería",
+            year=2023,
+            slug="examen-de-admision",
+            cover="test.png",
+            source_exam="http://example.com",
+        )
+        self.course = Course.objects.create(
+            name="Curso de álgebra", url="http://example.com"
+        )
+        self.post = Post.objects.create(
+            author=user,
+            section=section,
+            subsection=subsection,
+            title="Duda de ecuaciones",
+            body="<p>No entiendo el ejercicio de álgebra</p>",
+        )
+
+    def search(self, **params):
+        client = APIClient()
+        response = client.get(reverse("search:search"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)
+
+    def test_documents_follow_models(self):
+        self.assertEqual(SearchDocument.objects.count(), 4)
+
+        self.product.show = False
+        self.product.save()
+        self.exam.delete()
+        self.post.title = "Duda de inecuaciones"
+        self.post.save()
+
+        self.assertFalse(
+            SearchDocument.objects.filter(type=SearchTypes.PRODUCT).exists()
+        )
+        self.assertFalse(
+            SearchDocument.objects.filter(type=SearchTypes.EXAM).exists()
+        )
+        document = SearchDocument.objects.get(type=SearchTypes.POST)
+        self.assertEqual(document.title, "Duda de inecuaciones")
+        self.assertEqual(document.slug, self.post.slug)
+
+    def test_documents_follow_related_objects(self):
+        section = self.post.section
+        section.name = "Cursos libres"
+        section.save()
+        university = self.exam.university
+        university.name = "Universidad Nacional"
+        university.save()
+
+        self.post.refresh_from_db()
+        document = SearchDocument.objects.get(type=SearchTypes.POST)
+        self.assertEqual(document.url, self.post_path())
+        self.assertIn("/cursos-libres/", document.url)
+        document = SearchDocument.objects.get(type=SearchTypes.EXAM)
+        self.assertIn("Universidad Nacional", document.body)
+        self.assertEqual(self.search(q="nacional")["count"], 1)
+
+    def test_search_all_types(self):
+        json_res = self.search(q="álgebra")
+        results = {(item["type"], item["id"]) for item in json_res["results"]}
+
+        self.assertEqual(
+            results,
+            {
+                (SearchTypes.PRODUCT, self.product.id),
+                (SearchTypes.COURSE, self.course.id),
+                (SearchTypes.POST, self.post.id),
+            },
+        )
+
+    def test_search_by_type(self):
+        json_res = self.search(q="ecuaciones", type=SearchTypes.POST)
+
+        self.assertEqual(json_res["count"], 1)
+        self.assertEqual(json_res["results"][0]["url"], self.post_path())
+
+    def test_search_without_query(self):
+        self.assertEqual(self.search(q="")["count"], 0)
+
+    @skipUnless(connection.vendor == "postgresql", "Requires Postgres")
+    def test_search_ranked_with_headline(self):
+        results = self.search(q="ecuación")["results"]
+
+        # Stemmed words, matches in the title come first
+        self.assertEqual(
+            [item["type"] for item in results],
+            [SearchTypes.POST, SearchTypes.PRODUCT],
+        )
+        self.assertIn("<mark>", results[1]["headline"])
+
+    def test_rebuild_documents(self):
+        SearchDocument.objects.all().delete()
+        call_command("rebuild_search_documents", stdout=io.StringIO())
+
+        self.assertEqual(SearchDocument.objects.count(), 4)
+        self.assertEqual(self.search(q="admisión")["count"], 1)
+
+    def post_path(self):
+        return f"/forum/{self.post.section.slug}/posts/{self.post.slug}/"
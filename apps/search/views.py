@@ -0,0 +1,30 @@
+from core.paginators import CustomPagination
+from rest_framework import generics
+from search.models import SearchDocument
+from search.serializers import SearchDocumentSerializer
+
+from helpers.choices import SearchTypes
+
+
+class SearchAPIView(generics.ListAPIView):
+    """
+    Products, exams, courses and forum posts matching the ``q`` query
+    param, the most relevant first. ``type`` limits the results to one of
+    them.
+    """
+
+    serializer_class = SearchDocumentSerializer
+    pagination_class = CustomPagination
+
+    def get_queryset(self):
+        q = self.request.query_params.get("q", "").strip()
+        search_type = self.request.query_params.get("type")
+
+        if not q:
+            return SearchDocument.objects.none()
+
+        queryset = SearchDocument.objects.search(q)
+        if search_type in SearchTypes.values:
+            queryset = queryset.filter(type=search_type)
+
+        return queryset
@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import jwt
+from django.core.cache import cache
+
+from utils.services.cloudflare import Cloudflare
+
+# Seconds before the expiration of a video token when it stops being served
+# from the cache, so the player never gets an almost expired token
+VIDEO_TOKEN_EXPIRY_MARGIN = 60
+
+# Maximum number of tokens requested to Cloudflare at the same time
+VIDEO_TOKEN_MAX_WORKERS = 8
+
+
+def get_token_timeout(token):
+    try:
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except jwt.InvalidTokenError:
+        return 0
+    return claims.get("exp", 0) - int(time.time()) - VIDEO_TOKEN_EXPIRY_MARGIN
+
+
+def get_video_token_key(user, video_part):
+    return f"services:video-token:{user.id}:{video_part.id}"
+
+
+def cache_video_signed_url(key, result):
+    if "error" in result:
+        return
+
+    timeout = get_token_timeout(result["result"]["token"])
+    if timeout > 0:
+        cache.set(key, result, timeout)
+
+
+def get_video_signed_url(user, video_part):
+    """
+    Return the signed token of the video part for the user, reusing it until
+    it is close to expire.
+    """
+    key = get_video_token_key(user, video_part)
+
+    result = cache.get(key)
+    if result is None:
+        result = Cloudflare(user).get_video_signed_url(video_part.url)
+        cache_video_signed_url(key, result)
+
+    return result
+
+
+def get_video_signed_urls(user, video_parts):
+    """
+    Same as ``get_video_signed_url`` for many video parts, the tokens that
+    are not cached are requested concurrently. Return a dict of the results
+    by video part id.
+    """
+    keys = {
+        video_part.id: get_video_token_key(user, video_part)
+        for video_part in video_parts
+    }
+    cached = cache.get_many(keys.values())
+    results = {
+        video_part_id: cached[key]
+        for video_part_id, key in keys.items()
+        if key in cached
+    }
+
+    missing = [
+        video_part for video_part in video_parts if video_part.id not in results
+    ]
+    if missing:
+        cloudflare = Cloudflare(user)
+        workers = min(VIDEO_TOKEN_MAX_WORKERS, len(missing))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            fetched = executor.map(
+                lambda video_part: cloudflare.get_video_signed_url(
+                    video_part.url
+                ),
+                missing,
+            )
+            for video_part, result in zip(missing, fetched):
+                cache_video_signed_url(keys[video_part.id], result)
+                results[video_part.id] = result
+
+    return results
@@ -0,0 +1,88 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import boto3
+from botocore.client import Config
+from django.core.management.base import BaseCommand
+
+from utils.services.cloudflare import get_s3_client
+
+BUCKET_NAME = "bench"
+DOCUMENT = b"%PDF-1.4\n" + b"0" * 64 * 1024
+
+
+class S3StubHandler(BaseHTTPRequestHandler):
+    """Answers every GetObject with the same small PDF."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(DOCUMENT)))
+        self.send_header("ETag", '"bench"')
+        self.end_headers()
+        self.wfile.write(DOCUMENT)
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares creating a boto3 client per download against the shared "
+        "R2 client. Without --endpoint-url a local S3 stand-in is started."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--endpoint-url", default=None)
+        parser.add_argument("--bucket", default=BUCKET_NAME)
+        parser.add_argument("--key", default="exam.pdf")
+
+    def new_client(self, endpoint_url):
+        return boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            aws_access_key_id="bench",
+            aws_secret_access_key="bench",
+            config=Config(signature_version="s3v4"),
+        )
+
+    def shared_client(self, endpoint_url):
+        return get_s3_client(endpoint_url, "bench", "bench")
+
+    def measure(self, label, get_client, endpoint_url, options):
+        start = time.perf_counter()
+        for _ in range(options["requests"]):
+            client = get_client(endpoint_url)
+            response = client.get_object(
+                Bucket=options["bucket"], Key=options["key"]
+            )
+            response["Body"].read()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{label:<20} {elapsed / options['requests'] * 1000:>8.2f} "
+            "ms/download"
+        )
+
+    def handle(self, *args, **options):
+        server = None
+        endpoint_url = options["endpoint_url"]
+        if endpoint_url is None:
+            server = ThreadingHTTPServer(("127.0.0.1", 0), S3StubHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            endpoint_url = f"http://127.0.0.1:{server.server_port}"
+
+        try:
+            self.measure(
+                "client per request", self.new_client, endpoint_url, options
+            )
+            self.measure(
+                "shared client", self.shared_client, endpoint_url, options
+            )
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.3 on 2026-10-17 23:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0013_remove_exams_products_exams_source_video_product'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exams',
+            index=models.Index(condition=models.Q(('is_delete', False)), fields=['university', 'year'], name='exams_active_univ_year_idx'),
+        ),
+    ]
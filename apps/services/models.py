@@ -58,6 +58,16 @@ class Exams(models.Model):
     is_delete = models.BooleanField(null=False, default=False)
     # products = models.ManyToManyField(Product, related_name="exams", blank=True)
 
+    class Meta:
+        indexes = [
+            # The catalog of exams only lists the ones not deleted
+            models.Index(
+                fields=["university", "year"],
+                condition=models.Q(is_delete=False),
+                name="exams_active_univ_year_idx",
+            )
+        ]
+
     def clean(self):
         """Validate exam type and area before saving."""
         if self.university:
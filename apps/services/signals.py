@@ -0,0 +1,4 @@
+from core.cache import track_generation
+from services.models import Exams, University
+
+track_generation(University, Exams)
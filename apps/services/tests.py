@@ -1,12 +1,20 @@
+import base64
 import io
 import json
+import time
 from io import BytesIO
 from unittest.mock import patch
 
+import jwt
+from account.models import UserProduct
+from botocore.exceptions import ClientError
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
 from dashboard.models import DownloadExams
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils.text import slugify
 from PIL import Image
@@ -14,6 +22,10 @@ from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from services.models import Course, Exams, University
+from store.models import Product, VideoPart
+
+from helpers.choices import ProductTypes
+from utils.services.cloudflare import Cloudflare
 
 # Create your tests here.
 
@@ -171,6 +183,27 @@ class TestListExams(BaseServiceTestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(json_res["count"], self.num_exams_two)
 
+    def test_list_exams_with_cursor_pagination(self):
+        client = APIClient()
+        res = client.get(
+            reverse("services:exams-list"),
+            {"pagination": "cursor", "size": self.size_per_page},
+        )
+
+        slugs = []
+        while True:
+            json_res = json.loads(res.content)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", json_res)
+            slugs += [exam["slug"] for exam in json_res["results"]]
+            if json_res["next"] is None:
+                break
+            res = client.get(json_res["next"])
+
+        # Every exam once, even with many exams in the same year
+        expected = Exams.objects.order_by("-id").values_list("slug", flat=True)
+        self.assertEqual(slugs, list(expected))
+
     def test_filter_values_not_found(self):
         client = APIClient()
         res = client.get(
@@ -189,6 +222,25 @@ class TestListExams(BaseServiceTestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_get_filter_exams_updated_after_new_exam(self):
+        client = APIClient()
+        client.get(reverse("services:exams-filters"))
+
+        Exams.objects.create(
+            university=self.un_obj,
+            type="Ordinario",
+            area="Social",
+            year=2050,
+            title="Examen 2050",
+            slug="examen-2050",
+            cover="test.png",
+            source_exam="http//:example.com",
+        )
+        res = client.get(reverse("services:exams-filters"))
+        json_res = json.loads(res.content)
+
+        self.assertIn(2050, json_res["years"])
+
 
 class TestRetrieveExam(BaseServiceTestCase):
     def setUp(self):
@@ -219,10 +271,14 @@ class TestRetrieveExam(BaseServiceTestCase):
         )
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-    @patch("utils.services.cloudflare.Cloudflare.get_document")
+    @patch("utils.services.cloudflare.Cloudflare.get_document_object")
     def test_success_download_exam_by_slug(self, mock_get_exam):
         mock_stream = BytesIO(self.exam_content)  # Simulate a stream
-        mock_get_exam.return_value = mock_stream
+        mock_get_exam.return_value = {
+            "Body": mock_stream,
+            "ContentLength": len(self.exam_content),
+            "ETag": '"etag"',
+        }
         exam = Exams.objects.all().latest("pk")
 
         client = APIClient()
@@ -241,9 +297,97 @@ class TestRetrieveExam(BaseServiceTestCase):
             response["Content-Disposition"],
             f"attachment; filename={exam.slug}.pdf",
         )
+        self.assertEqual(
+            response["Content-Length"], str(len(self.exam_content))
+        )
+        self.assertEqual(response["ETag"], '"etag"')
         streamed_content = b"".join(response.streaming_content)
         self.assertEqual(streamed_content, self.exam_content)
 
+    @patch("utils.services.cloudflare.Cloudflare.get_document_object")
+    def test_success_download_exam_range(self, mock_get_exam):
+        mock_get_exam.return_value = {
+            "Body": BytesIO(self.exam_content[:8]),
+            "ContentLength": 8,
+            "ContentRange": f"bytes 0-7/{len(self.exam_content)}",
+            "ETag": '"etag"',
+        }
+        exam = Exams.objects.all().latest("pk")
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + self.access)
+        response = client.get(
+            reverse("services:exam-download", kwargs={"slug": exam.slug}),
+            HTTP_RANGE="bytes=0-7",
+        )
+
+        mock_get_exam.assert_called_with(
+            exam.source_exam, range="bytes=0-7", if_none_match=None
+        )
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(
+            response["Content-Range"], f"bytes 0-7/{len(self.exam_content)}"
+        )
+        # Only the first request of a download is recorded
+        self.assertFalse(DownloadExams.objects.exists())
+        self.assertEqual(response["Content-Length"], "8")
+        self.assertEqual(
+            b"".join(response.streaming_content), self.exam_content[:8]
+        )
+
+    @patch("utils.services.cloudflare.Cloudflare.get_document_object")
+    def test_download_exam_not_modified(self, mock_get_exam):
+        mock_get_exam.side_effect = ClientError(
+            {
+                "Error": {"Code": "304", "Message": "Not Modified"},
+                "ResponseMetadata": {"HTTPStatusCode": 304},
+            },
+            "GetObject",
+        )
+        exam = Exams.objects.all().latest("pk")
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + self.access)
+        response = client.get(
+            reverse("services:exam-download", kwargs={"slug": exam.slug}),
+            HTTP_IF_NONE_MATCH='"etag"',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], '"etag"')
+        self.assertFalse(DownloadExams.objects.exists())
+
+    @patch("utils.services.cloudflare.Cloudflare.get_document_size")
+    @patch("utils.services.cloudflare.Cloudflare.get_document_object")
+    def test_download_exam_range_not_satisfiable(
+        self, mock_get_exam, mock_get_size
+    ):
+        mock_get_exam.side_effect = ClientError(
+            {
+                "Error": {"Code": "InvalidRange", "Message": "Invalid Range"},
+                "ResponseMetadata": {"HTTPStatusCode": 416},
+            },
+            "GetObject",
+        )
+        mock_get_size.return_value = len(self.exam_content)
+        exam = Exams.objects.all().latest("pk")
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + self.access)
+        response = client.get(
+            reverse("services:exam-download", kwargs={"slug": exam.slug}),
+            HTTP_RANGE="bytes=9999-",
+        )
+
+        mock_get_size.assert_called_once_with(exam.source_exam)
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        )
+        self.assertEqual(
+            response["Content-Range"], f"bytes */{len(self.exam_content)}"
+        )
+
     def test_error_auth_download_exam_by_slug(self):
         exam = Exams.objects.all().latest("pk")
 
@@ -273,6 +417,43 @@ class TestRetrieveExam(BaseServiceTestCase):
         self.assertIsInstance(content, dict)
         self.assertFalse(download.download_successful)
 
+    @override_settings(EXAMS_R2_ENDPOINT_URL="http://127.0.0.1:9000")
+    def test_r2_client_is_reused(self):
+        first = Cloudflare().s3_client
+        second = Cloudflare().s3_client
+
+        self.assertIsNotNone(first)
+        self.assertIs(first, second)
+
+    @override_settings(DOCUMENT_DOWNLOAD_MODE="presigned")
+    @patch("utils.services.cloudflare.Cloudflare.get_document_url")
+    def test_success_presigned_download_exam(self, mock_get_url):
+        mock_get_url.return_value = "https://r2.example.com/exam.pdf?sig=1"
+        exam = Exams.objects.all().latest("pk")
+        url = reverse("services:exam-download", kwargs={"slug": exam.slug})
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + self.access)
+        response = client.get(url)
+        json_response = client.get(url, {"redirect": "false"})
+
+        mock_get_url.assert_called_with(
+            exam.source_exam, f"{exam.slug}.pdf", 60
+        )
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(response["Location"], mock_get_url.return_value)
+        self.assertEqual(json_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            json_response.json(),
+            {"url": mock_get_url.return_value, "expires_in": 60},
+        )
+        self.assertEqual(
+            DownloadExams.objects.filter(
+                exam=exam, download_successful=True
+            ).count(),
+            2,
+        )
+
 
 class TestCoursesList(BaseServiceTestCase):
     def test_success_get_list_courses(self):
@@ -280,3 +461,126 @@ class TestCoursesList(BaseServiceTestCase):
         response = client.get(reverse("services:courses-list"))
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TestVideoSignedURL(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        token, _ = Token.objects.get_or_create(user=self.user)
+        self.access = token.key
+
+        product = Product.objects.create(
+            name="Video", slug="video", price="10.00", type=ProductTypes.VIDEO
+        )
+        self.video_part = VideoPart.objects.create(
+            product=product, title="Parte 1", url="video-uid", part_number=1
+        )
+        UserProduct.objects.create(user=self.user, product=product)
+        self.url = reverse(
+            "services:video-signed-url", kwargs={"slug": product.slug}
+        )
+
+    def get_signed_url(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + self.access)
+        return client.get(self.url, {"part": 1})
+
+    @patch("utils.services.cloudflare.Cloudflare.get_video_signed_url")
+    def test_token_is_cached_until_expiration(self, mock_signed_url):
+        token = jwt.encode(
+            {"sub": "video-uid", "exp": int(time.time()) + 3600}, "secret"
+        )
+        mock_signed_url.return_value = {"result": {"token": token}}
+
+        first = self.get_signed_url()
+        second = self.get_signed_url()
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.json(), first.json())
+        mock_signed_url.assert_called_once_with("video-uid")
+
+    @patch("utils.services.cloudflare.Cloudflare.get_video_signed_url")
+    def test_expired_token_is_not_cached(self, mock_signed_url):
+        token = jwt.encode({"sub": "video-uid", "exp": int(time.time())}, "k")
+        mock_signed_url.return_value = {"result": {"token": token}}
+
+        self.get_signed_url()
+        self.get_signed_url()
+
+        self.assertEqual(mock_signed_url.call_count, 2)
+
+    def test_token_signed_locally(self):
+        private_key = rsa.generate_private_key(
+            public_exponent=65537, key_size=2048
+        )
+        pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+
+        with self.settings(
+            CF_STREAM_SIGNING_KEY_ID="key-id",
+            CF_STREAM_SIGNING_KEY=base64.b64encode(pem).decode(),
+        ), patch("requests.post") as mock_post:
+            response = self.get_signed_url()
+
+        token = response.json()["result"]["token"]
+        claims = jwt.decode(
+            token, private_key.public_key(), algorithms=["RS256"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(jwt.get_unverified_header(token)["kid"], "key-id")
+        self.assertEqual(claims["sub"], "video-uid")
+        mock_post.assert_not_called()
+
+    @override_settings(
+        CF_STREAM_SIGNING_KEY_ID=None, CF_STREAM_SIGNING_KEY="a2V5"
+    )
+    @patch("requests.post")
+    def test_token_not_signed_without_key_id(self, mock_post):
+        token = jwt.encode(
+            {"sub": "video-uid", "exp": int(time.time()) + 3600}, "secret"
+        )
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {"result": {"token": token}}
+
+        response = self.get_signed_url()
+
+        # The token comes from the API, not signed with a null kid
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["result"]["token"], token)
+        mock_post.assert_called_once()
+
+    @patch("utils.services.cloudflare.Cloudflare.get_video_signed_url")
+    def test_batch_signed_urls(self, mock_signed_url):
+        VideoPart.objects.create(
+            product=self.video_part.product,
+            title="Parte 2",
+            url="video-uid-2",
+            part_number=2,
+        )
+        exp = int(time.time()) + 3600
+        mock_signed_url.side_effect = lambda uid: {
+            "result": {"token": jwt.encode({"sub": uid, "exp": exp}, "k")}
+        }
+        # The first part is already cached
+        self.get_signed_url()
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + self.access)
+        response = client.get(
+            reverse("services:video-signed-urls", kwargs={"slug": "video"})
+        )
+        data = response.json()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([part["part_number"] for part in data], [1, 2])
+        self.assertEqual(
+            [jwt.decode(part["token"], "k", ["HS256"])["sub"] for part in data],
+            ["video-uid", "video-uid-2"],
+        )
+        self.assertEqual(mock_signed_url.call_count, 2)
@@ -37,4 +37,9 @@ urlpatterns = [
         views.VideoSignedURLView.as_view(),
         name="video-signed-url",
     ),
+    path(
+        "videos/<slug:slug>/signed-urls/",
+        views.VideoSignedURLsView.as_view(),
+        name="video-signed-urls",
+    ),
 ]
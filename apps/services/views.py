@@ -1,5 +1,6 @@
 from account.permissions import IsProductOwner
-from core.paginators import CustomPagination
+from core.cache import cache_response
+from core.paginators import CustomPagination, SelectablePaginationMixin
 from dashboard.models import DownloadExams
 from django.db import transaction
 from django.http import Http404
@@ -8,6 +9,7 @@ from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from services.cache import get_video_signed_url, get_video_signed_urls
 from services.models import Course, Exams, University
 from services.serializers import (
     CoursesSerializer,
@@ -18,15 +20,22 @@ from services.serializers import (
 from store.models import Product, VideoPart
 
 from helpers.choices import ProductTypes
-from helpers.responses import get_streaming_response
+from helpers.responses import get_document_response
 from utils.services.cloudflare import Cloudflare
 
 # Create your views here.
 
 
-class ExamsAPIView(generics.ListAPIView):
+class ExamsAPIView(SelectablePaginationMixin, generics.ListAPIView):
+    """
+    Exams, the most recent years first. With ``?pagination=cursor`` they are
+    ordered by upload instead (newest first), the cursor needs a unique
+    first key and the year is shared by many exams.
+    """
+
     serializer_class = ExamsSerializer
     pagination_class = CustomPagination
+    cursor_ordering = ("-id",)
 
     def get_queryset(self):
         queryset = Exams.objects.filter(is_delete=False)
@@ -64,6 +73,7 @@ class RetrieveExamsAPIView(generics.RetrieveAPIView):
 
 
 class GetExamsFilterAPIView(APIView):
+    @cache_response(University, Exams)
     def get(self, request, format=None, *args, **kwargs):
         universities = University.objects.order_by().values(
             "name", "siglas", "exam_types", "exam_areas"
@@ -75,6 +85,9 @@ class GetExamsFilterAPIView(APIView):
             .distinct()
         )
 
+        # Evaluated here so the data can be cached
+        universities, years = list(universities), list(years)
+
         data = {"universities": universities, "years": years}
 
         return Response(data, status=status.HTTP_200_OK)
@@ -94,22 +107,27 @@ class DownloadExamAPIView(APIView):
         exam = self.get_object(slug)
         exam_key = exam.source_exam
         cf = Cloudflare(user)
-        download = DownloadExams.objects.create(exam=exam, user=user)
+        # Resumed downloads (Range) and cached files (If-None-Match) are
+        # requests of a download already recorded
+        full_download = request.headers.get("Range", "bytes=0-") == "bytes=0-"
 
         try:
-            file_stream = cf.get_document(exam_key)
-            download.save()
-            # Return the file as a downloadable response
-            return get_streaming_response(file_stream, slug, "pdf")
+            response = get_document_response(request, cf, exam_key, slug)
         except Exception as error:
-            download.download_successful = False
-            download.save()
+            if full_download:
+                DownloadExams.objects.create(
+                    exam=exam, user=user, download_successful=False
+                )
             error_msg = {
                 "message": "No se pudo descargar el examen. Avisar a soporte sobre el problema",
                 "error": str(error),
             }
             return Response(error_msg, status=status.HTTP_400_BAD_REQUEST)
 
+        if full_download and response.status_code in (200, 206, 302):
+            DownloadExams.objects.create(exam=exam, user=user)
+        return response
+
 
 class UploadExamAPIView(APIView):
     permission_classes = (IsAdminUser,)
@@ -203,11 +221,8 @@ class VideoSignedURLView(generics.RetrieveAPIView):
     def get(self, request, *args, **kwargs):
         video_part = self.get_object()
 
-        # Initialize the Cloudflare class
-        cloudflare = Cloudflare()
-
         # Get the signed URL for the video
-        result = cloudflare.get_video_signed_url(video_part.url)
+        result = get_video_signed_url(request.user, video_part)
 
         # Check if there was an error
         if "error" in result:
@@ -215,3 +230,26 @@ class VideoSignedURLView(generics.RetrieveAPIView):
 
         # Return the signed URL
         return Response(result, status=status.HTTP_200_OK)
+
+
+class VideoSignedURLsView(ProductVideoPartsView):
+    """Signed tokens of all the parts of a video product in one request."""
+
+    def get(self, request, *args, **kwargs):
+        product = self.get_object()
+        video_parts = list(product.video_parts.all())
+        results = get_video_signed_urls(request.user, video_parts)
+
+        data = []
+        for video_part in video_parts:
+            result = results[video_part.id]
+            data.append(
+                {
+                    "part_number": video_part.part_number,
+                    "title": video_part.title,
+                    "token": result.get("result", {}).get("token"),
+                    "error": result.get("error"),
+                }
+            )
+
+        return Response(data, status=status.HTTP_200_OK)
@@ -7,6 +7,7 @@ from store.models import (
     Claim,
     Product,
     ProductAttribute,
+    ProductRecommendation,
     Sell,
     VideoPart,
 )
@@ -93,12 +94,13 @@ class SellAdmin(admin.ModelAdmin):
         "receipt_number",
         "user",
         "status",
+        "receipt_status",
         "total_cost",
         "paid_at",
         "order_id",
         "order_at",
     )
-    list_filter = ("status", "paid_at")
+    list_filter = ("status", "receipt_status", "paid_at")
     search_fields = (
         "user__username",
         "user_name",
@@ -115,3 +117,10 @@ admin.site.register(Category)
 admin.site.register(Attribute)
 admin.site.register(AttributeOption)
 admin.site.register(Claim)
+
+
+@admin.register(ProductRecommendation)
+class ProductRecommendationAdmin(admin.ModelAdmin):
+    list_display = ("product", "recommended", "score")
+    search_fields = ("product__name", "recommended__name")
+    ordering = ("product", "-score")
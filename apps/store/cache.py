@@ -0,0 +1,43 @@
+import hashlib
+import json
+
+from account.models import Profile
+from core.cache import RESPONSE_CACHE_TIMEOUT, get_generations
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from store.models import (
+    Attribute,
+    AttributeOption,
+    Category,
+    Product,
+    ProductAttribute,
+    ProductComment,
+)
+
+# Models whose changes affect the facets of the catalog
+FACET_MODELS = (Product, ProductAttribute, AttributeOption, Attribute)
+
+# Models rendered by CategorySerializer and ProductSerializer
+CATEGORY_MODELS = (Category, Attribute, AttributeOption)
+CATALOG_MODELS = FACET_MODELS + (Category, ProductComment, User, Profile)
+
+
+def get_facet_counts(category, facets):
+    """
+    Return the number of visible products per attribute option of the
+    category, restricted to the products matching the selected facets.
+    """
+    selected = json.dumps(sorted(facets.items()))
+    digest = hashlib.md5(selected.encode()).hexdigest()
+    generations = ":".join(map(str, get_generations(*FACET_MODELS)))
+    key = f"store:facet-counts:{generations}:{category}:{digest}"
+
+    counts = cache.get(key)
+    if counts is None:
+        queryset = Product.objects.filter(show=True, category_id=category)
+        if facets:
+            queryset = queryset.with_facets(facets)
+        counts = list(queryset.facet_counts())
+        cache.set(key, counts, RESPONSE_CACHE_TIMEOUT)
+
+    return counts
@@ -0,0 +1,135 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from store.models import (
+    Attribute,
+    AttributeOption,
+    Category,
+    Product,
+    ProductAttribute,
+    ProductFacet,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the catalog attribute filter using one join per attribute "
+        "against the ProductFacet index. Data is seeded inside a transaction "
+        "that is rolled back at the end."
+    )
+
+    num_attributes = 6
+    num_options = 5
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=50000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            category = self.seed(options["products"])
+            self.run(category, options["repeat"])
+            transaction.set_rollback(True)
+
+    def seed(self, num_products):
+        self.stdout.write(f"Seeding {num_products} products...")
+        rand = random.Random(0)
+        category = Category.objects.create(name=f"bench-{uuid.uuid4().hex}")
+
+        options_by_attribute = []
+        for i in range(self.num_attributes):
+            attribute = Attribute.objects.create(
+                name=f"Atributo {i}", label=f"attr{i}", category=category
+            )
+            options_by_attribute.append(
+                AttributeOption.objects.bulk_create(
+                    [
+                        AttributeOption(
+                            attribute=attribute,
+                            label=f"Opcion {j}",
+                            value=f"opt{j}",
+                        )
+                        for j in range(self.num_options)
+                    ]
+                )
+            )
+
+        Product.objects.bulk_create(
+            [
+                Product(
+                    name=f"bench {i}",
+                    slug=f"bench-{i}",
+                    price="10.00",
+                    category=category,
+                    identifier=uuid.uuid4().hex[:12].upper(),
+                )
+                for i in range(num_products)
+            ],
+            batch_size=1000,
+        )
+        product_ids = category.products.values_list("id", flat=True)
+
+        ProductAttribute.objects.bulk_create(
+            [
+                ProductAttribute(
+                    product_id=product_id, attribute_option=rand.choice(options)
+                )
+                for product_id in product_ids.iterator()
+                for options in options_by_attribute
+            ],
+            batch_size=1000,
+        )
+        ProductFacet.rebuild(list(product_ids))
+
+        return category
+
+    def legacy_queryset(self, category, facets):
+        queryset = Product.objects.filter(show=True, category=category)
+        for label, value in facets.items():
+            queryset = queryset.filter(
+                product_attributes__attribute_option__attribute__label=label,
+                product_attributes__attribute_option__value=value,
+            )
+        return queryset
+
+    def index_queryset(self, category, facets):
+        return Product.objects.filter(show=True, category=category).with_facets(
+            facets
+        )
+
+    def measure(self, queryset, repeat):
+        """Return the best time in ms of the count plus first page queries."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            queryset.count()
+            list(queryset.order_by("-id")[:10])
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
+
+    def run(self, category, repeat):
+        product = category.products.first()
+        selected = product.product_attributes.values_list(
+            "attribute_option__attribute__label", "attribute_option__value"
+        ).order_by("attribute_option__attribute__label")
+
+        self.stdout.write(
+            f"{'facets':>6} {'matches':>8} {'joins (ms)':>11} {'index (ms)':>11}"
+        )
+        for num_facets in range(1, self.num_attributes + 1):
+            facets = dict(selected[:num_facets])
+            legacy = self.legacy_queryset(category, facets)
+            index = self.index_queryset(category, facets)
+
+            matches = index.count()
+            if matches != legacy.count():
+                self.stderr.write(f"Mismatch with {num_facets} facets")
+
+            self.stdout.write(
+                f"{num_facets:>6} {matches:>8} "
+                f"{self.measure(legacy, repeat):>11.2f} "
+                f"{self.measure(index, repeat):>11.2f}"
+            )
@@ -0,0 +1,82 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.template.loader import get_template, render_to_string
+from weasyprint import CSS, HTML
+
+from utils.pdf import render_pdf, render_pdf_batch
+
+TEMPLATE_NAME = "store/invoice_template.html"
+STYLESHEET_NAME = "store/invoice_template.css"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures receipts rendered per second building a new weasyprint "
+        "document each time against the shared PDF renderer, with and "
+        "without a process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--receipts", type=int, default=50)
+        parser.add_argument("--processes", type=int, default=None)
+
+    def sample_receipt(self, number):
+        return {
+            "company_name": "Edukar",
+            "receipt_number": f"EDK-2024-{str(number).zfill(8)}",
+            "customer": {
+                "first_name": "Juan",
+                "last_name": "Perez",
+                "email": "juan.perez@example.com",
+            },
+            "products": [
+                {
+                    "name": f"Producto {i}",
+                    "quantity": 1,
+                    "price": Decimal("25.00"),
+                }
+                for i in range(5)
+            ],
+            "total": Decimal("125.00"),
+            "date": "1 de enero de 2024",
+        }
+
+    def render_fresh(self, receipt):
+        source = get_template(STYLESHEET_NAME).template.source
+        html_string = render_to_string(TEMPLATE_NAME, receipt)
+        return HTML(string=html_string).write_pdf(
+            stylesheets=[CSS(string=source)]
+        )
+
+    def measure(self, label, render, receipts):
+        start = time.perf_counter()
+        render(receipts)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{label:<20} {len(receipts) / elapsed:>10.2f} PDFs/s "
+            f"({elapsed:.2f} s)"
+        )
+
+    def handle(self, *args, **options):
+        receipts = [self.sample_receipt(i) for i in range(options["receipts"])]
+        jobs = [
+            (TEMPLATE_NAME, receipt, STYLESHEET_NAME) for receipt in receipts
+        ]
+
+        self.measure(
+            "fresh document",
+            lambda items: [self.render_fresh(item) for item in items],
+            receipts,
+        )
+        self.measure(
+            "shared renderer",
+            lambda items: [render_pdf(*job) for job in items],
+            jobs,
+        )
+        self.measure(
+            "process pool",
+            lambda items: render_pdf_batch(items, options["processes"]),
+            jobs,
+        )
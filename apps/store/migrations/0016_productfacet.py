@@ -0,0 +1,45 @@
+# Generated by Django 4.0.3 on 2026-10-17 23:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_product_facets(apps, schema_editor):
+    ProductAttribute = apps.get_model('store', 'ProductAttribute')
+    ProductFacet = apps.get_model('store', 'ProductFacet')
+
+    product_attributes = ProductAttribute.objects.values_list(
+        'product_id',
+        'attribute_option__attribute__label',
+        'attribute_option__value',
+    )
+    ProductFacet.objects.bulk_create(
+        [
+            ProductFacet(product_id=product_id, key=f'{label}:{value}')
+            for product_id, label, value in product_attributes.iterator()
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_product_published_at_alter_product_product_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=201)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='store.product')),
+            ],
+            options={
+                'unique_together': {('key', 'product')},
+            },
+        ),
+        migrations.RunPython(build_product_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.0.3 on 2026-10-17 23:20
+
+from django.db import migrations, models
+
+
+def init_receipt_sequence(apps, schema_editor):
+    Sell = apps.get_model('store', 'Sell')
+    ReceiptSequence = apps.get_model('store', 'ReceiptSequence')
+
+    last_number = Sell.objects.aggregate(
+        last_number=models.Max('receipt_number')
+    )['last_number']
+    ReceiptSequence.objects.create(pk=1, last_number=last_number or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0017_productrecommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceiptSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(init_receipt_sequence, migrations.RunPython.noop),
+    ]
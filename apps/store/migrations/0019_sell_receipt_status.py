@@ -0,0 +1,27 @@
+# Generated by Django 4.0.3 on 2026-10-17 23:21
+
+from django.db import migrations, models
+
+
+def set_sent_receipt_status(apps, schema_editor):
+    # Receipts were generated and emailed during the payment until now
+    Sell = apps.get_model('store', 'Sell')
+    Sell.objects.exclude(receipt__isnull=True).exclude(receipt='').update(
+        receipt_status=3
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0018_receiptsequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sell',
+            name='receipt_status',
+            field=models.PositiveIntegerField(choices=[(1, 'Pendiente'), (2, 'Generado'), (3, 'Enviado'), (4, 'Fallido')], default=1),
+        ),
+        migrations.RunPython(set_sent_receipt_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.0.3 on 2026-10-17 23:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0019_sell_receipt_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['show', '-id'], name='store_produ_show_c94a70_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sell',
+            index=models.Index(fields=['user', 'status', '-paid_at'], name='store_sell_user_id_29b2ea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sell',
+            index=models.Index(condition=models.Q(('order_id__isnull', False)), fields=['order_id'], name='sell_order_id_idx'),
+        ),
+    ]
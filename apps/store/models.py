@@ -5,15 +5,15 @@ from decimal import Decimal
 from babel.dates import format_date
 from django.contrib.auth.models import User
 from django.core.files.base import ContentFile
-from django.db import models
-from django.template.loader import render_to_string
+from django.db import connection, models, transaction
 from django.utils import timezone
 from django.utils.text import slugify
 from django_resized import ResizedImageField
-from weasyprint import HTML
 
 from apps.core.models import StatusModel, TimeStampModel
-from helpers.choices import ProductTypes, SellStatus, TypeGoods
+from core.cache import bump_generation
+from helpers.choices import ProductTypes, ReceiptStatus, SellStatus, TypeGoods
+from utils.pdf import render_pdf
 
 # Create your models here.
 
@@ -57,6 +57,54 @@ class AttributeOption(models.Model):
         return f"{self.value} ({self.attribute.name})"
 
 
+class ProductQuerySet(models.QuerySet):
+    def with_catalog_data(self):
+        """
+        Load everything ProductSerializer needs (category, package items and
+        comments with their authors) in a fixed number of queries.
+        """
+        comments = models.Prefetch(
+            "comments",
+            queryset=ProductComment.objects.select_related(
+                "user"
+            ).prefetch_related("user__profile"),
+        )
+        items = models.Prefetch(
+            "items",
+            queryset=Product.objects.select_related(
+                "category"
+            ).prefetch_related(comments),
+        )
+        return self.select_related("category").prefetch_related(items, comments)
+
+    def with_facets(self, facets):
+        """
+        Filter products having every attribute given in ``facets`` (a dict of
+        attribute label -> option value) using the ProductFacet index.
+        """
+        keys = {
+            ProductFacet.build_key(label, value)
+            for label, value in facets.items()
+        }
+        matching = (
+            ProductFacet.objects.filter(key__in=keys)
+            .values("product")
+            .annotate(num_facets=models.Count("key"))
+            .filter(num_facets=len(keys))
+            .values("product")
+        )
+        return self.filter(id__in=matching)
+
+    def facet_counts(self):
+        """Number of products of this queryset per attribute option."""
+        return (
+            ProductAttribute.objects.filter(product__in=self.order_by())
+            .values("attribute_option")
+            .annotate(count=models.Count("product"))
+            .order_by("attribute_option")
+        )
+
+
 class Product(models.Model):
     def product_upload_to(self, filename):
         ext = filename.split(".")[-1]
@@ -95,6 +143,11 @@ class Product(models.Model):
     )
     published_at = models.DateField(null=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=["show", "-id"])]
+
     @property
     def is_one_time_purchase(self):
         if self.category:
@@ -157,6 +210,56 @@ class ProductAttribute(models.Model):
         return f"{self.product.name} - {self.attribute_option.value} ({self.attribute_option.attribute.name})"
 
 
+class ProductFacet(models.Model):
+    """
+    Denormalized "label:value" keys of the attribute options of a product.
+    It is kept in sync with ProductAttribute by the store signals and lets
+    the catalog filter by several attributes without joining per attribute.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="facets"
+    )
+    key = models.CharField(max_length=201)
+
+    class Meta:
+        unique_together = ("key", "product")
+
+    def __str__(self):
+        return f"{self.product_id} - {self.key}"
+
+    @staticmethod
+    def build_key(label, value):
+        return f"{label}:{value}"
+
+    @classmethod
+    def rebuild(cls, product_ids=None):
+        """Recompute the facets of the given products (all if None)."""
+        product_attributes = ProductAttribute.objects.values_list(
+            "product_id",
+            "attribute_option__attribute__label",
+            "attribute_option__value",
+        )
+        facets = cls.objects.all()
+
+        if product_ids is not None:
+            product_attributes = product_attributes.filter(
+                product_id__in=product_ids
+            )
+            facets = facets.filter(product_id__in=product_ids)
+
+        with transaction.atomic():
+            facets.delete()
+            cls.objects.bulk_create(
+                [
+                    cls(product_id=product_id, key=cls.build_key(label, value))
+                    for product_id, label, value in product_attributes
+                ],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+
+
 class VideoPart(models.Model):
     product = models.ForeignKey(
         Product,
@@ -181,6 +284,26 @@ class VideoPart(models.Model):
         return super().save(*args, **kwargs)
 
 
+class ReceiptSequence(models.Model):
+    """
+    Counter of the receipt numbers. Its row is locked while a sell is being
+    marked as paid so the numbers are unique and without gaps.
+    """
+
+    last_number = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.last_number)
+
+    @classmethod
+    def next_number(cls):
+        """Allocate the next receipt number. Must run inside a transaction."""
+        sequence, _ = cls.objects.select_for_update().get_or_create(pk=1)
+        sequence.last_number += 1
+        sequence.save(update_fields=["last_number"])
+        return sequence.last_number
+
+
 class Sell(models.Model):
     def product_upload_to(self, filename):
         # Get the current timestamp and format it as "YYYYMMDD_HHMMSS"
@@ -218,6 +341,9 @@ class Sell(models.Model):
     receipt = models.FileField(
         upload_to=receipt_upload_to, null=True, blank=True
     )
+    receipt_status = models.PositiveIntegerField(
+        choices=ReceiptStatus.choices, default=ReceiptStatus.PENDING
+    )
     total_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True)
 
     # Campos para rellenar los valores de la transacción
@@ -237,6 +363,16 @@ class Sell(models.Model):
         null=True, blank=True, editable=False
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "status", "-paid_at"]),
+            models.Index(
+                fields=["order_id"],
+                condition=models.Q(order_id__isnull=False),
+                name="sell_order_id_idx",
+            ),
+        ]
+
     # TODO: Remove this classmethod because it is not used
     # Delete this commented classmethod because it is not used anywhere.
     # @classmethod
@@ -258,13 +394,25 @@ class Sell(models.Model):
         return total_cost
 
     def mark_as_paid(self, sell_data):
-        """Marca la venta como pagada y asigna el número del comprobante."""
-        self.status = SellStatus.FINISHED
-        last_receipt = Sell.objects.filter(status=SellStatus.FINISHED).count()
-        self.receipt_number = last_receipt + 1
-        self.paid_at = timezone.now()
-        self.metadata = sell_data
-        self.save()
+        """
+        Marca la venta como pagada y asigna el número del comprobante.
+        Retorna False si la venta ya estaba pagada (e.g. el webhook y el
+        pago llegaron al mismo tiempo) para no asignar dos comprobantes.
+        """
+        with transaction.atomic():
+            # Lock the sell so concurrent calls are serialized
+            sell = Sell.objects.select_for_update().get(pk=self.pk)
+            if sell.status == SellStatus.FINISHED:
+                self.refresh_from_db()
+                return False
+
+            self.status = SellStatus.FINISHED
+            self.receipt_number = ReceiptSequence.next_number()
+            self.paid_at = timezone.now()
+            self.metadata = sell_data
+            self.save()
+
+        return True
 
     @property
     def to_receipt_json(self):
@@ -302,17 +450,151 @@ class Sell(models.Model):
         return receipt
 
     def generate_receipt(self):
-        receipt = self.to_receipt_json
-        html_string = render_to_string("store/invoice_template.html", receipt)
         # Generate the PDF
-        html = HTML(string=html_string)
-        pdf_content = html.write_pdf()
+        pdf_content = render_pdf(
+            "store/invoice_template.html",
+            self.to_receipt_json,
+            "store/invoice_template.css",
+        )
 
         # Save the PDF in the receipt field
         pdf_filename = f"receipt_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         self.receipt.save(pdf_filename, ContentFile(pdf_content))
 
 
+class ProductRecommendation(models.Model):
+    """
+    Precomputed top related products of the same category of a product,
+    scored by the attribute options they share and how many times they were
+    bought together.
+    """
+
+    # Number of recommendations stored per product
+    TOP_N = 8
+    SHARED_OPTION_WEIGHT = 1
+    CO_PURCHASE_WEIGHT = 2
+    # Options set on more products don't tell them apart (e.g. the type) and
+    # would pair every product having them
+    MAX_OPTION_PRODUCTS = 200
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="recommendations"
+    )
+    recommended = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="recommended_by"
+    )
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ("product", "recommended")
+        indexes = [models.Index(fields=["product", "-score"])]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.recommended_id} ({self.score})"
+
+    @classmethod
+    def get_rebuild_sql(cls, num_products):
+        """
+        INSERT ... SELECT that scores the related products of a batch of
+        products and keeps the TOP_N of each one, so the pairs are never
+        loaded in Python. The options of more than MAX_OPTION_PRODUCTS
+        products are skipped, which bounds the pairs made per product.
+        """
+        recommendation = cls._meta.db_table
+        product = Product._meta.db_table
+        product_attribute = ProductAttribute._meta.db_table
+        package_item = Product.items.through._meta.db_table
+        sell = Sell._meta.db_table
+        sell_product = Sell.products.through._meta.db_table
+        batch = ", ".join(["%s"] * num_products)
+
+        return f"""
+            INSERT INTO {recommendation} (product_id, recommended_id, score)
+            SELECT product_id, recommended_id, score
+            FROM (
+                SELECT
+                    pairs.product_id,
+                    pairs.recommended_id,
+                    SUM(pairs.weight) AS score,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY pairs.product_id
+                        ORDER BY SUM(pairs.weight) DESC,
+                            pairs.recommended_id DESC
+                    ) AS position
+                FROM (
+                    SELECT a.product_id, b.product_id AS recommended_id,
+                        %s AS weight
+                    FROM {product_attribute} a
+                    JOIN {product_attribute} b
+                        ON b.attribute_option_id = a.attribute_option_id
+                    WHERE a.product_id IN ({batch})
+                        AND a.attribute_option_id IN (
+                            SELECT attribute_option_id
+                            FROM {product_attribute}
+                            GROUP BY attribute_option_id
+                            HAVING COUNT(*) <= %s
+                        )
+                    UNION ALL
+                    SELECT a.product_id, b.product_id AS recommended_id,
+                        %s AS weight
+                    FROM {sell_product} a
+                    JOIN {sell} s ON s.id = a.sell_id
+                    JOIN {sell_product} b ON b.sell_id = a.sell_id
+                    WHERE a.product_id IN ({batch}) AND s.status = %s
+                ) pairs
+                JOIN {product} source ON source.id = pairs.product_id
+                JOIN {product} recommended
+                    ON recommended.id = pairs.recommended_id
+                WHERE pairs.recommended_id <> pairs.product_id
+                    AND recommended.category_id = source.category_id
+                    AND recommended.show = %s
+                    AND NOT EXISTS (
+                        SELECT 1
+                        FROM {package_item} item
+                        JOIN {product} package
+                            ON package.id = item.from_product_id
+                        WHERE item.from_product_id = pairs.product_id
+                            AND item.to_product_id = pairs.recommended_id
+                            AND package.type = %s
+                    )
+                GROUP BY pairs.product_id, pairs.recommended_id
+            ) ranked
+            WHERE position <= %s
+        """
+
+    @classmethod
+    def rebuild(cls, product_ids=None, batch_size=1000):
+        """
+        Recompute the recommendations of the given products (all if None).
+        The products are scored by batches inside the database, so the memory
+        used does not depend on the size of the catalog.
+        """
+        if product_ids is None:
+            product_ids = Product.objects.values_list("id", flat=True)
+        product_ids = sorted(product_ids)
+
+        for start in range(0, len(product_ids), batch_size):
+            batch = product_ids[start : start + batch_size]
+            params = [
+                cls.SHARED_OPTION_WEIGHT,
+                *batch,
+                cls.MAX_OPTION_PRODUCTS,
+                cls.CO_PURCHASE_WEIGHT,
+                *batch,
+                SellStatus.FINISHED,
+                True,
+                ProductTypes.PACKAGE,
+                cls.TOP_N,
+            ]
+            with transaction.atomic():
+                cls.objects.filter(product_id__in=batch).delete()
+                with connection.cursor() as cursor:
+                    cursor.execute(cls.get_rebuild_sql(len(batch)), params)
+
+        # Bulk operations do not send signals
+        bump_generation(cls)
+
+
 class Claim(models.Model):
     def claim_upload_to(self, filename):
         # Get the current timestamp and format it as "YYYYMMDD_HHMMSS"
@@ -3,10 +3,9 @@ import re
 from decimal import Decimal
 
 from account.models import UserProduct
-from account.serializers import AuthorSerializer
+from account.serializers import AuthorCardListSerializer, AuthorSerializer
 from django.core.files.base import ContentFile
 from django.db import transaction
-from django.template.loader import render_to_string
 from django.utils import timezone
 from django.utils.translation import gettext as _
 from rest_framework import serializers
@@ -19,9 +18,9 @@ from store.models import (
     ProductComment,
     Sell,
 )
-from weasyprint import HTML
 
 from helpers.choices import ProductTypes
+from utils.pdf import render_pdf
 from utils.services.culqi import Culqi
 
 logger = logging.getLogger(__name__)
@@ -54,6 +53,7 @@ class ProductCommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ProductComment
+        list_serializer_class = AuthorCardListSerializer
         fields = ["user", "comment", "created_at"]
 
 
@@ -312,7 +312,13 @@ class SellSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Sell
-        fields = ["products", "total_cost", "paid_at"]
+        fields = ["products", "total_cost", "paid_at", "receipt_status"]
+
+
+class SellReceiptSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Sell
+        fields = ["id", "receipt_number", "receipt_status", "receipt"]
 
 
 class CreateSellSerializer(serializers.ModelSerializer):
@@ -390,13 +396,11 @@ class ClaimSerializer(serializers.ModelSerializer):
                 claim = Claim.objects.create(**validated_data)
 
                 # generate the pdf for the receipt
-                claim_data = claim.form_data
-                html_string = render_to_string(
-                    "store/form_lreclamaciones.html", claim_data
+                pdf_content = render_pdf(
+                    "store/form_lreclamaciones.html",
+                    claim.form_data,
+                    "store/form_lreclamaciones.css",
                 )
-                # Generate the PDF
-                html = HTML(string=html_string)
-                pdf_content = html.write_pdf()
 
                 # Save the PDF in the receipt field
                 pdf_filename = (
@@ -0,0 +1,52 @@
+from core.cache import track_generation
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from store.models import (
+    Attribute,
+    AttributeOption,
+    Category,
+    Product,
+    ProductAttribute,
+    ProductComment,
+    ProductFacet,
+)
+
+
+@receiver(post_save, sender=ProductAttribute)
+@receiver(post_delete, sender=ProductAttribute)
+def update_product_facets(sender, instance, **kwargs):
+    ProductFacet.rebuild([instance.product_id])
+
+
+@receiver(post_save, sender=AttributeOption)
+def update_option_facets(sender, instance, created, **kwargs):
+    if created:
+        return
+
+    product_ids = instance.product_attributes.values_list(
+        "product_id", flat=True
+    )
+    ProductFacet.rebuild(list(product_ids))
+
+
+@receiver(post_save, sender=Attribute)
+def update_attribute_facets(sender, instance, created, **kwargs):
+    if created:
+        return
+
+    product_ids = ProductAttribute.objects.filter(
+        attribute_option__attribute=instance
+    ).values_list("product_id", flat=True)
+    ProductFacet.rebuild(list(product_ids))
+
+
+# Connected after the facet receivers so the index is already rebuilt when
+# the cached catalog responses become stale.
+track_generation(
+    Category,
+    Attribute,
+    AttributeOption,
+    Product,
+    ProductAttribute,
+    ProductComment,
+)
@@ -4,14 +4,42 @@ from babel.dates import format_date
 from django.conf import settings
 from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
-from huey.contrib.djhuey import task
-from store.models import Claim, Sell
+from huey import crontab
+from huey.contrib.djhuey import HUEY, db_periodic_task, task
+from store.models import Claim, ProductRecommendation, Sell
+
+from helpers.choices import ReceiptStatus
 
 logger = logging.getLogger(__name__)
 
 
+@task(retries=3, retry_delay=60, context=True)
+def generate_sell_receipt(sell_id: int, task=None):
+    """Render the receipt PDF of a paid sell, retrying if it fails."""
+    sell = Sell.objects.select_related("user").get(pk=sell_id)
+
+    try:
+        sell.generate_receipt()
+    except Exception:
+        logger.exception(
+            f"Error al generar la boleta de la compra con ID '{sell_id}'"
+        )
+        # Only mark it as failed when there are no retries left
+        if task is None or not task.retries:
+            sell.receipt_status = ReceiptStatus.FAILED
+            sell.save(update_fields=["receipt_status"])
+        raise
+
+    sell.receipt_status = ReceiptStatus.GENERATED
+    sell.save(update_fields=["receipt_status"])
+
+    # Passed to the next task of the pipeline
+    return sell_id
+
+
 @task()
-def send_sell_receipt_to_user_email(sell: Sell):
+def send_sell_receipt_to_user_email(sell_id: int):
+    sell = Sell.objects.select_related("user").get(pk=sell_id)
     user = sell.user
 
     context = {
@@ -34,11 +62,25 @@ def send_sell_receipt_to_user_email(sell: Sell):
     email_msg.attach("Boleta de pago.pdf", receipt_pdf.read())
     email_msg.send(fail_silently=False)
 
+    sell.receipt_status = ReceiptStatus.SENT
+    sell.save(update_fields=["receipt_status"])
+
     logger.info(
         f"Se ha enviado el correo al usuario {user.username}, con ID de compra '{sell.id}'"
     )
 
 
+def enqueue_sell_receipt(sell: Sell):
+    """
+    Generate the receipt and then email it to the user in the huey workers
+    so the payment response does not wait for the PDF rendering.
+    """
+    pipeline = generate_sell_receipt.s(sell.id).then(
+        send_sell_receipt_to_user_email
+    )
+    return HUEY.enqueue(pipeline)
+
+
 @task()
 def send_user_claim(claim: Claim):
     name = claim.name
@@ -66,3 +108,9 @@ def send_user_claim(claim: Claim):
     logger.info(
         f"Se ha enviado el correo al usuario {claim.name}, con ID de reclamo '{claim.id}'"
     )
+
+
+@db_periodic_task(crontab(minute="0"))
+def rebuild_product_recommendations():
+    ProductRecommendation.rebuild()
+    logger.info("Se recalcularon las recomendaciones de productos")
@@ -1,17 +1,41 @@
 import json
-
-from account.models import UserProduct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import skipUnless
+from unittest.mock import patch
+
+from account.models import Profile, UserProduct
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.text import slugify
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from services.models import Exams, University
-from store.models import Attribute, AttributeOption, Category, Product
-
-from helpers.choices import ProductTypes
+from store.models import (
+    Attribute,
+    AttributeOption,
+    Category,
+    Product,
+    ProductAttribute,
+    ProductComment,
+    ProductFacet,
+    ProductRecommendation,
+    ReceiptSequence,
+    Sell,
+)
+from store.tasks import generate_sell_receipt
+
+from helpers.choices import ProductTypes, ReceiptStatus, SellStatus
+from utils.products import assign_product_to_user
+from utils.services import culqi
 
 # Create your tests here.
 
@@ -218,3 +242,562 @@ class TestSellProducts(BaseServiceTestCase):
         )
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestProductCatalogQueries(BaseServiceTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.users = []
+        for i in range(3):
+            user = User.objects.create_user(
+                username=f"commenter{i}",
+                email=f"commenter{i}@example.com",
+                password="testpassword",
+            )
+            Profile.objects.create(user=user)
+            self.users.append(user)
+
+        for i in range(10):
+            product = Product.objects.create(
+                type=ProductTypes.DOCUMENT,
+                name=f"Documento {i}",
+                price="10.00",
+                category=self.category,
+            )
+            for user in self.users:
+                ProductComment.objects.create(
+                    user=user, product=product, comment="Buen producto"
+                )
+
+            package = Product.objects.create(
+                type=ProductTypes.PACKAGE,
+                name=f"Paquete {i}",
+                price="25.00",
+                category=self.category,
+            )
+            package.items.add(product)
+
+    def count_list_queries(self, size):
+        client = APIClient()
+        with CaptureQueriesContext(connection) as context:
+            res = client.get(reverse("store:product-list"), {"size": size})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(json.loads(res.content)["results"]), size)
+        return len(context.captured_queries)
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        self.assertEqual(
+            self.count_list_queries(2), self.count_list_queries(10)
+        )
+
+    def test_list_comments_include_author_picture(self):
+        client = APIClient()
+        res = client.get(reverse("store:product-list"), {"size": 2})
+        data = json.loads(res.content)["results"]
+        package = next(p for p in data if p["type"] == ProductTypes.PACKAGE)
+        comments = package["items"][0]["comments"]
+
+        self.assertEqual(len(comments), len(self.users))
+        self.assertTrue(comments[0]["user"]["picture"])
+
+
+class BaseProductAttributesTestCase(BaseServiceTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.attribute_year = Attribute.objects.create(
+            name="Año", label="year", category=self.category
+        )
+        self.attribute_univ.label = "univ"
+        self.attribute_univ.save()
+
+        self.option_unm = self.attribute_univ.options.get(
+            value="Universidad Nacional Mayor"
+        )
+        self.option_unsa = self.attribute_univ.options.get(
+            value="Universidad Nacional San Agustín"
+        )
+        self.option_2023 = AttributeOption.objects.create(
+            attribute=self.attribute_year, label="2023", value="2023"
+        )
+
+        self.product_unm = Product.objects.create(
+            name="Solucionario UNM", price="10.00", category=self.category
+        )
+        self.product_unm_2023 = Product.objects.create(
+            name="Solucionario UNM 2023", price="10.00", category=self.category
+        )
+        self.product_unsa_2023 = Product.objects.create(
+            name="Solucionario UNSA 2023", price="10.00", category=self.category
+        )
+
+        ProductAttribute.objects.create(
+            product=self.product_unm, attribute_option=self.option_unm
+        )
+        ProductAttribute.objects.create(
+            product=self.product_unm_2023, attribute_option=self.option_unm
+        )
+        ProductAttribute.objects.create(
+            product=self.product_unm_2023, attribute_option=self.option_2023
+        )
+        ProductAttribute.objects.create(
+            product=self.product_unsa_2023, attribute_option=self.option_unsa
+        )
+        ProductAttribute.objects.create(
+            product=self.product_unsa_2023, attribute_option=self.option_2023
+        )
+
+
+class TestProductFacetFilter(BaseProductAttributesTestCase):
+    def get_product_names(self, params):
+        client = APIClient()
+        res = client.get(reverse("store:product-list"), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return {
+            product["name"] for product in json.loads(res.content)["results"]
+        }
+
+    def test_filter_by_one_attribute(self):
+        names = self.get_product_names({"univ": "Universidad Nacional Mayor"})
+        self.assertEqual(
+            names, {self.product_unm.name, self.product_unm_2023.name}
+        )
+
+    def test_filter_by_several_attributes(self):
+        names = self.get_product_names(
+            {"univ": "Universidad Nacional Mayor", "year": "2023"}
+        )
+        self.assertEqual(names, {self.product_unm_2023.name})
+
+    def test_facets_follow_product_attribute_changes(self):
+        ProductAttribute.objects.get(
+            product=self.product_unsa_2023, attribute_option=self.option_2023
+        ).delete()
+        names = self.get_product_names({"year": "2023"})
+        self.assertEqual(names, {self.product_unm_2023.name})
+
+        self.option_2023.value = "2024"
+        self.option_2023.save()
+        self.assertFalse(ProductFacet.objects.filter(key="year:2023").exists())
+        names = self.get_product_names({"year": "2024"})
+        self.assertEqual(names, {self.product_unm_2023.name})
+
+    def get_facet_counts(self, params):
+        client = APIClient()
+        res = client.get(reverse("store:category-facet-counts"), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        counts = json.loads(res.content)["counts"]
+        return {item["attribute_option"]: item["count"] for item in counts}
+
+    def test_facet_counts_of_category(self):
+        counts = self.get_facet_counts({"category": self.category.id})
+        self.assertEqual(
+            counts,
+            {
+                self.option_unm.id: 2,
+                self.option_unsa.id: 1,
+                self.option_2023.id: 2,
+            },
+        )
+
+    def test_facet_counts_with_selected_attributes(self):
+        counts = self.get_facet_counts(
+            {"category": self.category.id, "univ": "Universidad Nacional Mayor"}
+        )
+        self.assertEqual(
+            counts, {self.option_unm.id: 2, self.option_2023.id: 1}
+        )
+
+    def test_facet_counts_invalidated_on_product_change(self):
+        params = {"category": self.category.id, "year": "2023"}
+        self.assertEqual(self.get_facet_counts(params)[self.option_2023.id], 2)
+
+        self.product_unsa_2023.show = False
+        self.product_unsa_2023.save()
+        self.assertEqual(self.get_facet_counts(params)[self.option_2023.id], 1)
+
+    def test_facet_counts_requires_category(self):
+        client = APIClient()
+        res = client.get(reverse("store:category-facet-counts"))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestCatalogResponseCache(BaseServiceTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.product = Product.objects.create(
+            name="Solucionario", price="10.00", category=self.category
+        )
+
+    def test_cached_list_does_not_query_database(self):
+        client = APIClient()
+        url = reverse("store:product-list")
+        client.get(url)
+
+        with self.assertNumQueries(0):
+            res = client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_invalidated_on_product_update(self):
+        client = APIClient()
+        url = reverse("store:product-list")
+        client.get(url)
+
+        self.product.name = "Solucionario actualizado"
+        self.product.save()
+
+        res = client.get(url)
+        data = json.loads(res.content)
+        self.assertEqual(data["results"][0]["name"], self.product.name)
+
+    def test_category_filters_invalidated_on_new_option(self):
+        client = APIClient()
+        url = reverse("store:category-filters")
+        client.get(url)
+
+        AttributeOption.objects.create(
+            attribute=self.attribute_univ, value="Universidad de Lima"
+        )
+
+        res = client.get(url)
+        options = json.loads(res.content)[0]["attributes"][0]["options"]
+        self.assertIn("Universidad de Lima", [o["value"] for o in options])
+
+
+class TestProductRecommendations(BaseProductAttributesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product_unm_2022 = Product.objects.create(
+            name="Solucionario UNM 2022", price="10.00", category=self.category
+        )
+        ProductAttribute.objects.create(
+            product=self.product_unm_2022, attribute_option=self.option_unm
+        )
+
+        user = User.objects.create_user(username="buyer", password="pass")
+        sell = Sell.objects.create(user=user, status=SellStatus.FINISHED)
+        sell.products.add(self.product_unm_2023, self.product_unsa_2023)
+
+    def get_recommendations(self, product):
+        client = APIClient()
+        res = client.get(
+            reverse(
+                "store:product-recommendations", kwargs={"slug": product.slug}
+            )
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [product["name"] for product in json.loads(res.content)]
+
+    def test_recommendations_ranked_by_score(self):
+        ProductRecommendation.rebuild()
+
+        # Shares the university and year with product_unm_2023 and the year
+        # plus a purchase with product_unsa_2023
+        self.assertEqual(
+            self.get_recommendations(self.product_unm_2023),
+            [
+                self.product_unsa_2023.name,
+                self.product_unm_2022.name,
+                self.product_unm.name,
+            ],
+        )
+
+    def test_recommendations_only_from_the_same_category(self):
+        other_category = Category.objects.create(name="Libros")
+        book = Product.objects.create(
+            name="Libro UNM", price="10.00", category=other_category
+        )
+        ProductAttribute.objects.create(
+            product=book, attribute_option=self.option_unm
+        )
+        sell = Sell.objects.filter(status=SellStatus.FINISHED).first()
+        sell.products.add(book)
+        ProductRecommendation.rebuild()
+
+        self.assertNotIn(
+            book.name, self.get_recommendations(self.product_unm_2023)
+        )
+
+    def test_recommendations_skip_options_of_most_products(self):
+        sell = Sell.objects.filter(status=SellStatus.FINISHED).first()
+        sell.products.clear()
+
+        # The university of product_unm_2022 is set on too many products
+        with patch.object(ProductRecommendation, "MAX_OPTION_PRODUCTS", 2):
+            ProductRecommendation.rebuild()
+
+        self.assertNotIn(
+            self.product_unm_2022.name,
+            self.get_recommendations(self.product_unm_2023),
+        )
+
+    def test_recommendations_exclude_hidden_products(self):
+        self.product_unsa_2023.show = False
+        self.product_unsa_2023.save()
+        ProductRecommendation.rebuild()
+
+        self.assertNotIn(
+            self.product_unsa_2023.name,
+            self.get_recommendations(self.product_unm_2023),
+        )
+
+    def test_recommendations_hidden_after_rebuild(self):
+        ProductRecommendation.rebuild()
+        self.product_unsa_2023.show = False
+        self.product_unsa_2023.save()
+
+        self.assertNotIn(
+            self.product_unsa_2023.name,
+            self.get_recommendations(self.product_unm_2023),
+        )
+
+    def test_recommendations_not_found(self):
+        client = APIClient()
+        res = client.get(
+            reverse("store:product-recommendations", kwargs={"slug": "nope"})
+        )
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@skipUnless(
+    connection.features.has_select_for_update,
+    "Requires a database with row locks",
+)
+class TestReceiptSequence(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="buyer", password="pass")
+        ReceiptSequence.objects.update_or_create(
+            pk=1, defaults={"last_number": 0}
+        )
+        self.sells = [
+            Sell.objects.create(user=self.user, total_cost="10.00")
+            for _ in range(10)
+        ]
+
+    def mark_as_paid(self, sell_id):
+        try:
+            return Sell.objects.get(pk=sell_id).mark_as_paid({})
+        finally:
+            connections.close_all()
+
+    def test_parallel_payments_get_contiguous_receipt_numbers(self):
+        # Every sell is paid twice at the same time (pay and webhook)
+        sell_ids = [sell.id for sell in self.sells] * 2
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(self.mark_as_paid, sell_ids))
+
+        self.assertEqual(results.count(True), len(self.sells))
+        numbers = sorted(
+            Sell.objects.filter(status=SellStatus.FINISHED).values_list(
+                "receipt_number", flat=True
+            )
+        )
+        self.assertEqual(numbers, list(range(1, len(self.sells) + 1)))
+
+
+class TestSellReceipt(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpassword",
+        )
+        token, _ = Token.objects.get_or_create(user=self.user)
+        self.access = token.key
+
+        self.product_1 = Product.objects.create(
+            name="Producto 1", price="10.00", type=ProductTypes.DOCUMENT
+        )
+        self.sell = Sell.objects.create(
+            user=self.user,
+            total_cost="10.00",
+            user_name="testuser",
+            user_last_name="testuser",
+            user_email=self.user.email,
+        )
+        self.sell.products.add(self.product_1)
+        self.sell.mark_as_paid({})
+
+    def test_receipt_generated_and_sent_after_assigning_products(self):
+        assign_product_to_user(self.sell)
+        self.sell.refresh_from_db()
+
+        self.assertTrue(
+            UserProduct.objects.filter(
+                user=self.user, product=self.product_1
+            ).exists()
+        )
+        self.assertTrue(self.sell.receipt)
+        self.assertEqual(self.sell.receipt_status, ReceiptStatus.SENT)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_receipt_marked_as_failed(self):
+        with patch.object(Sell, "generate_receipt", side_effect=OSError):
+            with self.assertRaises(OSError), self.assertLogs("store.tasks"):
+                generate_sell_receipt.call_local(self.sell.id)
+
+        self.sell.refresh_from_db()
+        self.assertEqual(self.sell.receipt_status, ReceiptStatus.FAILED)
+
+    def test_get_receipt_status(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + self.access)
+        res = client.get(
+            reverse("store:sell-receipt", kwargs={"pk": self.sell.pk})
+        )
+        data = json.loads(res.content)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(data["receipt_status"], ReceiptStatus.PENDING)
+        self.assertEqual(data["receipt_number"], self.sell.receipt_number)
+
+    def test_download_receipt(self):
+        self.sell.generate_receipt()
+        with self.sell.receipt.open("rb") as receipt:
+            content = receipt.read()
+        url = reverse(
+            "store:sell-receipt-download", kwargs={"pk": self.sell.pk}
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + self.access)
+
+        res = client.get(url)
+        with self.settings(DOCUMENT_DOWNLOAD_MODE="accel"):
+            accel_res = client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(res.streaming_content), content)
+        self.assertEqual(accel_res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            accel_res["X-Accel-Redirect"],
+            f"/internal/media/{self.sell.receipt.name}",
+        )
+        self.assertEqual(accel_res.content, b"")
+
+    def test_download_receipt_of_other_user(self):
+        self.sell.generate_receipt()
+        other = User.objects.create_user(username="other", password="pass")
+        token, _ = Token.objects.get_or_create(user=other)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+
+        res = client.get(
+            reverse("store:sell-receipt-download", kwargs={"pk": self.sell.pk})
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CulqiStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(("GET", self.path, self.client_address[1]))
+        status_code = server.responses.pop(0) if server.responses else 200
+        self.reply(status_code, {"id": self.path.rsplit("/", 1)[-1]})
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers["Content-Length"])
+        self.rfile.read(length)
+        server.requests.append(("POST", self.path, self.client_address[1]))
+        time.sleep(getattr(server, "delay", 0))
+        status_code = server.responses.pop(0) if server.responses else 201
+        self.reply(status_code, {"id": "ord_test"})
+
+    def reply(self, status_code, data):
+        body = json.dumps(data).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting, e.g. after a read timeout
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCulqiClient(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), CulqiStubHandler)
+        self.server.requests = []
+        self.server.responses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        base_url = f"http://127.0.0.1:{self.server.server_port}/v2"
+        self.settings_override = override_settings(CULQI_BASE_URL=base_url)
+        self.settings_override.enable()
+        culqi.reset_session()
+        culqi.metrics.reset()
+
+    def tearDown(self):
+        culqi.reset_session()
+        self.settings_override.disable()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_is_reused(self):
+        client = culqi.Culqi()
+        client.consult_order("ord_1")
+        culqi.Culqi().consult_order("ord_2")
+
+        ports = {port for _, _, port in self.server.requests}
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(len(ports), 1)
+
+    def test_consult_order_is_retried(self):
+        self.server.responses = [503]
+
+        data = culqi.Culqi().consult_order("ord_1")
+
+        self.assertEqual(data, {"id": "ord_1"})
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(culqi.metrics.snapshot()["consult_order"]["count"], 1)
+
+    def test_charge_is_not_retried(self):
+        self.server.responses = [503]
+        sell = Sell(total_cost=10)
+
+        response = culqi.Culqi().create_charge(sell, email="a@a.com")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.requests), 1)
+        stats = culqi.metrics.snapshot()["create_charge"]
+        self.assertEqual(stats["errors"], 1)
+
+    def test_pay_charge_timeout(self):
+        self.server.delay = 0.5
+        user = User.objects.create_user(username="buyer", password="test")
+        sell = Sell.objects.create(
+            user=user, total_cost=10, status=SellStatus.PENDING
+        )
+        token, _ = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+        payment = {
+            "first_name": "Juan",
+            "last_name": "Perez",
+            "token": "tkn_test",
+            "email": "juan@example.com",
+            "phone_number": "999999999",
+            "device_id": "device",
+        }
+
+        with self.settings(CULQI_TIMEOUT=(1, 0.1)):
+            res = client.post(
+                reverse("store:sell-pay", kwargs={"pk": sell.pk}),
+                payment,
+                format="json",
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+        self.assertEqual(len(self.server.requests), 1)
+        sell.refresh_from_db()
+        self.assertEqual(sell.status, SellStatus.PENDING)
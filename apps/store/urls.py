@@ -20,6 +20,11 @@ urlpatterns = [
         views.CategoryFiltersAPIView.as_view(),
         name="category-filters",
     ),
+    path(
+        "category/facet-counts",
+        views.CategoryFacetCountsAPIView.as_view(),
+        name="category-facet-counts",
+    ),
     # path("payment", views.UserProductBulkCreateView.as_view(), name="payment"),
     # path(
     #     "invoice/send/<int:sell_id>/",
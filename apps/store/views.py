@@ -1,7 +1,9 @@
 import logging
 
+import requests
 from account.models import UserProduct
 from account.permissions import IsProductOwner
+from core.cache import cache_response
 from core.paginators import CustomPagination
 from django.http import Http404
 from django.utils.translation import gettext as _
@@ -16,7 +18,14 @@ from rest_framework.viewsets import (
     GenericViewSet,
     ReadOnlyModelViewSet,
 )
-from store.models import Category, Product, ProductComment, Sell
+from store.cache import CATALOG_MODELS, CATEGORY_MODELS, get_facet_counts
+from store.models import (
+    Category,
+    Product,
+    ProductComment,
+    ProductRecommendation,
+    Sell,
+)
 from store.serializers import (
     CategorySerializer,
     ChargePaymentSerializer,
@@ -24,11 +33,12 @@ from store.serializers import (
     CreateSellSerializer,
     ProductCreateCommentSerializer,
     ProductSerializer,
+    SellReceiptSerializer,
 )
 from store.tasks import send_user_claim
 
-from helpers.choices import ProductTypes, SellStatus
-from helpers.responses import get_streaming_response
+from helpers.choices import SellStatus
+from helpers.responses import get_document_response, get_media_file_response
 from utils.products import assign_product_to_user
 from utils.services.cloudflare import Cloudflare
 from utils.services.culqi import Culqi
@@ -38,45 +48,82 @@ from utils.services.culqi import Culqi
 
 logger = logging.getLogger(__name__)
 
+# Query params of the catalog that are not product attributes
+NON_ATTRIBUTE_PARAMS = ("page", "size", "category")
+
 
 class CategoryFiltersAPIView(APIView):
+    @cache_response(*CATEGORY_MODELS)
     def get(self, request, format=None):
         queryset = Category.objects.all()
         serializer = CategorySerializer(queryset, many=True)
         return Response(serializer.data)
 
 
+class CategoryFacetCountsAPIView(APIView):
+    def get(self, request, format=None):
+        query_params = request.query_params
+
+        try:
+            category = int(query_params["category"])
+        except KeyError:
+            return Response(
+                {"category": "Este campo es requerido"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except ValueError:
+            return Response(
+                {"category": "Debe ser un número entero"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        facets = {
+            key: value
+            for key, value in query_params.items()
+            if key not in NON_ATTRIBUTE_PARAMS
+        }
+        counts = get_facet_counts(category, facets)
+        return Response({"category": category, "counts": counts})
+
+
 class ProductViewSet(ReadOnlyModelViewSet):
     pagination_class = CustomPagination
     serializer_class = ProductSerializer
     lookup_field = "slug"
 
+    @cache_response(*CATALOG_MODELS)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(*CATALOG_MODELS)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_queryset(self):
-        queryset = Product.objects.filter(show=True).order_by("-id")
+        queryset = (
+            Product.objects.filter(show=True)
+            .with_catalog_data()
+            .order_by("-id")
+        )
         query_params = self.request.query_params
         category = query_params.get("category", None)
         attribute_params = {
             key: value
             for key, value in query_params.items()
-            if key not in ["page", "size", "category"]
+            if key not in NON_ATTRIBUTE_PARAMS
         }
         # Filter by category if provided
         if category:
             queryset = queryset.filter(category_id=category)
 
-        # Apply filters for attributes dynamically
+        # Apply filters for attributes with a single lookup on the facet index
         if attribute_params:
-            for attr, value in attribute_params.items():
-                # Filter for each attribute key-value pair
-                queryset = queryset.filter(
-                    product_attributes__attribute_option__attribute__label=attr,
-                    product_attributes__attribute_option__value=value,
-                )
+            queryset = queryset.with_facets(attribute_params)
 
         return queryset
 
-    # TODO: Hacer tests de este endpoint
     @action(detail=True, methods=["get"])
+    @cache_response(*CATALOG_MODELS, ProductRecommendation)
     def recommendations(self, request, slug=None):
         """
         Get recommended products based on the given product.
@@ -84,36 +131,22 @@ class ProductViewSet(ReadOnlyModelViewSet):
         try:
             # Fetch the product by slug
             product = Product.objects.get(slug=slug)
-
-            # Logic to find recommended products
-            # Example: Products in the same category, excluding the current product
-            recommended_products = Product.objects.filter(
-                category=product.category
-            ).exclude(id=product.id)
-
-            if product.type == ProductTypes.PACKAGE:
-                recommended_products = recommended_products.exclude(
-                    id__in=product.items.values_list("id", flat=True)
-                )
-
-            # Additional filtering based on shared attributes
-            shared_attributes = product.product_attributes.values_list(
-                "attribute_option", flat=True
-            )
-            recommended_products = recommended_products.filter(
-                product_attributes__attribute_option__in=shared_attributes
-            ).distinct()
-
-            # Get only the last four recommended products
-            recommended_products = recommended_products.order_by("-id")[:4]
-
-            # Serialize the recommendations
-            serializer = self.get_serializer(recommended_products, many=True)
-            return Response(serializer.data)
-
         except Product.DoesNotExist:
             return Response({"detail": "Product not found."}, status=404)
 
+        # Recommendations are precomputed by the
+        # rebuild_product_recommendations task, so they are read in order.
+        # Products hidden since the last rebuild are skipped.
+        recommended_products = (
+            Product.objects.filter(recommended_by__product=product, show=True)
+            .with_catalog_data()
+            .order_by("-recommended_by__score", "-id")[:4]
+        )
+
+        # Serialize the recommendations
+        serializer = self.get_serializer(recommended_products, many=True)
+        return Response(serializer.data)
+
     # TODO: Hacer tests de este endpoint
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated])
     def comment(self, request, slug=None):
@@ -185,15 +218,33 @@ class StartSellView(mixins.CreateModelMixin, GenericViewSet):
         validated_data = serializer.validated_data
 
         culqi = Culqi()
-        response = culqi.create_charge(sell, **validated_data)
+        try:
+            response = culqi.create_charge(sell, **validated_data)
+        except requests.RequestException as e:
+            # The charge may have been made, the status of the sell is left
+            # as it is for the webhook or a retry to settle it
+            logger.error(
+                f"El usuario {sell.user.username} no obtuvo respuesta de "
+                f"Culqi al pagar: ID de compra {sell.id}: {str(e)}"
+            )
+            timed_out = isinstance(e, requests.Timeout)
+            return Response(
+                {"error": _("No se pudo contactar con la pasarela de pago.")},
+                status=(
+                    status.HTTP_504_GATEWAY_TIMEOUT
+                    if timed_out
+                    else status.HTTP_502_BAD_GATEWAY
+                ),
+            )
         status_code = response.status_code
 
         if status_code == 201:
             sell_data = response.json()
-            sell.mark_as_paid(sell_data)
 
-            # Register user products
-            assign_product_to_user(sell)
+            # Register user products only once even if the webhook already
+            # marked the sell as paid
+            if sell.mark_as_paid(sell_data):
+                assign_product_to_user(sell)
 
             logger.info(
                 f"El usuario {sell.user.username} realizó su compra de manera exitosa: "
@@ -232,6 +283,36 @@ class StartSellView(mixins.CreateModelMixin, GenericViewSet):
         sell.save()
         return Response(status=status.HTTP_200_OK)
 
+    @action(
+        detail=True,
+        methods=["GET"],
+        url_name="receipt",
+        url_path="receipt",
+    )
+    def receipt(self, request, pk=None):
+        """Status of the receipt, which is generated after the payment."""
+        sell: Sell = self.get_object()
+        if sell.user != request.user:
+            raise Http404
+
+        serializer = SellReceiptSerializer(sell, context={"request": request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(
+        detail=True,
+        methods=["GET"],
+        url_name="receipt-download",
+        url_path="receipt/download",
+    )
+    def receipt_download(self, request, pk=None):
+        sell: Sell = self.get_object()
+        if sell.user != request.user or not sell.receipt:
+            raise Http404
+
+        return get_media_file_response(
+            sell.receipt, f"boleta-{sell.receipt_number}"
+        )
+
     @action(
         detail=True,
         methods=["GET"],
@@ -289,9 +370,7 @@ class DownloadProductDocumentView(APIView):
         cf = Cloudflare(user)
 
         try:
-            file_stream = cf.get_document(doc_key)
-            # Return the file as a downloadable response
-            return get_streaming_response(file_stream, slug, "pdf")
+            return get_document_response(request, cf, doc_key, slug)
         except Exception as error:
             error_msg = {
                 "message": "No se pudo descargar el documento. Avisar a soporte sobre el problema",
@@ -44,8 +44,8 @@ class ChangeOrderWebhook(CreateAPIView):
 
         if sells.exists() and order_status == "paid":
             sell = sells.first()
-            sell.mark_as_paid(data)
-            assign_product_to_user(sell)
+            if sell.mark_as_paid(data):
+                assign_product_to_user(sell)
 
             logger.info(
                 f"El usuario {sell.user.username} realizó su compra de manera exitosa: "
@@ -17,3 +17,23 @@ class ProductTypes(models.IntegerChoices):
 class TypeGoods(models.IntegerChoices):
     PRODUCT = 1, _("Producto")
     SERVICE = 2, _("Servicio")
+
+
+class ReceiptStatus(models.IntegerChoices):
+    PENDING = 1, _("Pendiente")
+    GENERATED = 2, _("Generado")
+    SENT = 3, _("Enviado")
+    FAILED = 4, _("Fallido")
+
+
+class DownloadModes(models.TextChoices):
+    STREAM = "stream", _("Descarga a través de la API")
+    PRESIGNED = "presigned", _("URL prefirmada de R2")
+    ACCEL = "accel", _("X-Accel-Redirect de nginx")
+
+
+class SearchTypes(models.TextChoices):
+    PRODUCT = "product", _("Producto")
+    EXAM = "exam", _("Examen")
+    COURSE = "course", _("Curso")
+    POST = "post", _("Publicación del foro")
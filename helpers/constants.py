@@ -1,2 +1,10 @@
 # first params in section slug and second is post slug
 POST_PATH = '/forum/{}/posts/{}/'
+
+# Internal nginx locations used with X-Accel-Redirect (see nginx/nginx.conf)
+ACCEL_MEDIA_LOCATION = '/internal/media/'
+ACCEL_R2_LOCATION = '/internal/r2/'
+
+# Postgres text search configuration: spanish with unaccent, see the forum
+# migration 0016_post_search_vector
+SEARCH_CONFIG = 'spanish_unaccent'
@@ -1,4 +1,18 @@
-from django.http import StreamingHttpResponse
+from urllib.parse import urlsplit
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseNotModified,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
+from rest_framework.response import Response
+
+from helpers.choices import DownloadModes
+from helpers.constants import ACCEL_MEDIA_LOCATION, ACCEL_R2_LOCATION
 
 
 def get_streaming_response(streaming, filename, type):
@@ -40,3 +54,118 @@ def get_streaming_response(streaming, filename, type):
         )
         response["Access-Control-Expose-Headers"] = "Content-Disposition"
         return response
+
+
+def get_document_response(request, cloudflare, document, filename):
+    """
+    Response to download a PDF stored in R2 following DOCUMENT_DOWNLOAD_MODE.
+    In presigned mode the client is redirected to R2, or gets the URL as
+    JSON with ``?redirect=false``, and in accel mode nginx proxies the file
+    from R2, so in both cases the file is not proxied by the API.
+    """
+    if settings.DOCUMENT_DOWNLOAD_MODE == DownloadModes.ACCEL:
+        url = urlsplit(
+            cloudflare.get_document_url(
+                document,
+                f"{filename}.pdf",
+                settings.DOCUMENT_PRESIGNED_URL_EXPIRES,
+            )
+        )
+        location = f"{ACCEL_R2_LOCATION}{url.scheme}/{url.netloc}{url.path}"
+        if url.query:
+            location = f"{location}?{url.query}"
+        return get_accel_redirect_response(location, filename)
+
+    if settings.DOCUMENT_DOWNLOAD_MODE == DownloadModes.PRESIGNED:
+        expires_in = settings.DOCUMENT_PRESIGNED_URL_EXPIRES
+        url = cloudflare.get_document_url(
+            document, f"{filename}.pdf", expires_in
+        )
+        if request.GET.get("redirect") == "false":
+            return Response({"url": url, "expires_in": expires_in})
+        return HttpResponseRedirect(url)
+
+    return get_document_streaming_response(
+        request, cloudflare, document, filename
+    )
+
+
+def iter_chunks(body, chunk_size):
+    try:
+        yield from iter(lambda: body.read(chunk_size), b"")
+    finally:
+        body.close()
+
+
+def get_document_streaming_response(request, cloudflare, document, filename):
+    """
+    Stream a PDF of R2 through the API supporting Range and If-None-Match,
+    so interrupted downloads can be resumed and unchanged files are not
+    downloaded again.
+    """
+    try:
+        document_object = cloudflare.get_document_object(
+            document,
+            range=request.headers.get("Range"),
+            if_none_match=request.headers.get("If-None-Match"),
+        )
+    except ClientError as error:
+        metadata = error.response["ResponseMetadata"]
+        if metadata["HTTPStatusCode"] == 304:
+            response = HttpResponseNotModified()
+            response["ETag"] = request.headers["If-None-Match"]
+            return response
+        if metadata["HTTPStatusCode"] == 416:
+            response = HttpResponse(status=416)
+            size = cloudflare.get_document_size(document)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        raise error
+
+    response = get_streaming_response(
+        iter_chunks(
+            document_object["Body"], settings.DOCUMENT_STREAM_CHUNK_SIZE
+        ),
+        filename,
+        "pdf",
+    )
+    response["Accept-Ranges"] = "bytes"
+    response["Content-Length"] = document_object["ContentLength"]
+    if "ETag" in document_object:
+        response["ETag"] = document_object["ETag"]
+    if "ContentRange" in document_object:
+        response.status_code = 206
+        response["Content-Range"] = document_object["ContentRange"]
+    response["Access-Control-Expose-Headers"] = (
+        "Content-Disposition, Content-Length, Content-Range, ETag"
+    )
+    return response
+
+
+def get_accel_redirect_response(location, filename):
+    """
+    Empty response telling nginx to serve the PDF from one of its internal
+    locations, Django only checks the permissions of the user.
+    """
+    response = HttpResponse(content_type="application/pdf")
+    response["X-Accel-Redirect"] = location
+    response["Content-Disposition"] = f"attachment; filename={filename}.pdf"
+    response["Access-Control-Expose-Headers"] = "Content-Disposition"
+    return response
+
+
+def get_media_file_response(file, filename):
+    """Download a PDF stored in the media folder, e.g. the receipts."""
+    if settings.DOCUMENT_DOWNLOAD_MODE == DownloadModes.ACCEL:
+        return get_accel_redirect_response(
+            f"{ACCEL_MEDIA_LOCATION}{file.name}", filename
+        )
+
+    response = FileResponse(
+        file.open("rb"),
+        as_attachment=True,
+        filename=f"{filename}.pdf",
+        content_type="application/pdf",
+    )
+    response["Access-Control-Expose-Headers"] = "Content-Disposition"
+    return response
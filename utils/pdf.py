@@ -0,0 +1,83 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from django.template.loader import get_template, render_to_string
+from weasyprint import CSS, HTML, default_url_fetcher
+from weasyprint.text.fonts import FontConfiguration
+
+_local = threading.local()
+
+
+@lru_cache(maxsize=32)
+def _fetch_url(url):
+    result = default_url_fetcher(url)
+    if "file_obj" in result:
+        file_obj = result.pop("file_obj")
+        result["string"] = file_obj.read()
+        file_obj.close()
+    return result
+
+
+def cached_url_fetcher(url):
+    """
+    Fetch resources (e.g. the logo of the receipts) only once per process
+    instead of downloading them on every render.
+    """
+    return dict(_fetch_url(url))
+
+
+class PDFRenderer:
+    """
+    Render templates to PDF keeping the parsed stylesheets and the loaded
+    fonts between renders. Use ``get_renderer`` to get the instance of the
+    current thread, weasyprint objects are not meant to be shared between
+    threads.
+    """
+
+    def __init__(self):
+        self.font_config = FontConfiguration()
+        self.stylesheets = {}
+
+    def get_stylesheet(self, stylesheet_name):
+        if stylesheet_name not in self.stylesheets:
+            source = get_template(stylesheet_name).template.source
+            self.stylesheets[stylesheet_name] = CSS(
+                string=source,
+                font_config=self.font_config,
+                url_fetcher=cached_url_fetcher,
+            )
+        return self.stylesheets[stylesheet_name]
+
+    def render(self, template_name, context, stylesheet_name):
+        html_string = render_to_string(template_name, context)
+        html = HTML(string=html_string, url_fetcher=cached_url_fetcher)
+        return html.write_pdf(
+            stylesheets=[self.get_stylesheet(stylesheet_name)],
+            font_config=self.font_config,
+        )
+
+
+def get_renderer():
+    if not hasattr(_local, "renderer"):
+        _local.renderer = PDFRenderer()
+    return _local.renderer
+
+
+def render_pdf(template_name, context, stylesheet_name):
+    """Render a template with its stylesheet and return the PDF bytes."""
+    return get_renderer().render(template_name, context, stylesheet_name)
+
+
+def _render_job(job):
+    return render_pdf(*job)
+
+
+def render_pdf_batch(jobs, processes=None):
+    """
+    Render a list of (template_name, context, stylesheet_name) jobs in a
+    process pool. Each process keeps its own renderer, so the stylesheets
+    and fonts are loaded once per process and not once per PDF.
+    """
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(_render_job, jobs))
@@ -1,6 +1,7 @@
+from account.cache import invalidate_owned_products
 from account.models import UserProduct
 from store.models import Sell
-from store.tasks import send_sell_receipt_to_user_email
+from store.tasks import enqueue_sell_receipt
 
 from helpers.choices import ProductTypes
 
@@ -22,7 +23,7 @@ def assign_product_to_user(sell: Sell):
             # Add non-package products directly
             user_products.append(UserProduct(user=user, product=product))
 
+    # bulk_create does not send signals, so the cache is cleared here
     UserProduct.objects.bulk_create(user_products)
-    sell.generate_receipt()
-    sell.save()
-    send_sell_receipt_to_user_email(sell)
+    invalidate_owned_products(user.id)
+    enqueue_sell_receipt(sell)
@@ -1,13 +1,49 @@
+import base64
 import logging
+import threading
+import time
 
 import boto3
 import botocore
+import jwt
 import requests
 from botocore.client import Config
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+_s3_clients = {}
+_s3_clients_lock = threading.Lock()
+
+
+def get_s3_client(endpoint_url, access_key_id, secret_access_key):
+    """
+    Return the S3 client of the given endpoint and credentials, creating it
+    only the first time. boto3 clients are thread-safe and keep their own
+    connection pool, so one client is shared by every request of the
+    process.
+    """
+    key = (endpoint_url, access_key_id, secret_access_key)
+    client = _s3_clients.get(key)
+    if client is None:
+        with _s3_clients_lock:
+            client = _s3_clients.get(key)
+            if client is None:
+                # Sessions are not thread-safe, use a new one for each client
+                session = boto3.session.Session()
+                client = session.client(
+                    "s3",
+                    endpoint_url=endpoint_url,
+                    aws_access_key_id=access_key_id,
+                    aws_secret_access_key=secret_access_key,
+                    config=Config(
+                        signature_version="s3v4",
+                        max_pool_connections=settings.R2_MAX_POOL_CONNECTIONS,
+                    ),
+                )
+                _s3_clients[key] = client
+    return client
+
 
 class Cloudflare:
     def __init__(self, user=None):
@@ -17,6 +53,8 @@ class Cloudflare:
         # Env variables to get access to bucket
         self.account_id = settings.CF_ACCOUNT_ID
         self.video_image_token = settings.CF_VIDEO_IMAGE_TOKEN
+        self.stream_signing_key_id = settings.CF_STREAM_SIGNING_KEY_ID
+        self.stream_signing_key = settings.CF_STREAM_SIGNING_KEY
         self.access_key_id = settings.EXAMS_ACCESS_KEY_ID
         self.secret_access_key = settings.EXAMS_SECRET_ACCESS_KEY
         self.bucket_name = settings.EXAMS_BUCKET_NAME
@@ -25,32 +63,72 @@ class Cloudflare:
         self.s3_client = self._create_client()
 
     def _create_client(self):
-        environment = settings.ENVIRONMENT
-        if environment == "PROD":
-            return boto3.client(
-                "s3",
-                endpoint_url=f"https://{self.account_id}.r2.cloudflarestorage.com",
-                aws_access_key_id=self.access_key_id,
-                aws_secret_access_key=self.secret_access_key,
-                config=Config(signature_version="s3v4"),
+        endpoint_url = settings.EXAMS_R2_ENDPOINT_URL
+        if endpoint_url is None and settings.ENVIRONMENT == "PROD":
+            endpoint_url = f"https://{self.account_id}.r2.cloudflarestorage.com"
+
+        if endpoint_url is not None:
+            return get_s3_client(
+                endpoint_url, self.access_key_id, self.secret_access_key
             )
 
     def get_document(self, document: str):
+        return self.get_document_object(document)["Body"]
+
+    def get_document_object(
+        self, document: str, range: str = None, if_none_match: str = None
+    ):
+        """
+        Return the ``get_object`` response of the document. ``range`` and
+        ``if_none_match`` are the values of the Range and If-None-Match
+        headers of the request, which are forwarded to R2.
+        """
         logger.info(f"El usuario '{self.user}' quiere acceder a '{document}'")
+        params = {"Bucket": self.bucket_name, "Key": document}
+        if range:
+            params["Range"] = range
+        if if_none_match:
+            params["IfNoneMatch"] = if_none_match
+
         try:
-            response = self.s3_client.get_object(
-                Bucket=self.bucket_name, Key=document
-            )
+            response = self.s3_client.get_object(**params)
             logger.info(
                 f"El usuario '{self.user}' accedió exitosamente a '{document}'"
             )
         except botocore.exceptions.ClientError as error:
-            logger.warn(
-                f"El usuario '{self.user}' falló al descargar '{document}'"
-            )
+            status_code = error.response["ResponseMetadata"]["HTTPStatusCode"]
+            if status_code != 304:
+                logger.warn(
+                    f"El usuario '{self.user}' falló al descargar '{document}'"
+                )
             raise error
 
-        return response["Body"]
+        return response
+
+    def get_document_size(self, document: str):
+        """Size in bytes of the document, read from its metadata."""
+        response = self.s3_client.head_object(
+            Bucket=self.bucket_name, Key=document
+        )
+        return response["ContentLength"]
+
+    def get_document_url(self, document: str, filename: str, expires_in: int):
+        """Short-lived URL to download the document directly from R2."""
+        url = self.s3_client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket_name,
+                "Key": document,
+                "ResponseContentType": "application/pdf",
+                "ResponseContentDisposition": f"attachment; filename={filename}",
+            },
+            ExpiresIn=expires_in,
+        )
+        logger.info(
+            f"Se generó la URL de descarga de '{document}' para el usuario "
+            f"'{self.user}'"
+        )
+        return url
 
     def put_exam(self, file, name):
         logger.info(f"Se va a subir el examen {name}")
@@ -65,7 +143,36 @@ class Cloudflare:
             )
             raise error
 
+    def sign_video_token(self, video_uid):
+        """
+        Sign the token of the video with the Stream signing key, which is
+        what the Cloudflare token endpoint does without the API call.
+        """
+        now = int(time.time())
+        payload = {
+            "sub": video_uid,
+            "kid": self.stream_signing_key_id,
+            "nbf": now - 60,
+            "exp": now + settings.CF_STREAM_TOKEN_TTL,
+        }
+        return jwt.encode(
+            payload,
+            base64.b64decode(self.stream_signing_key),
+            algorithm="RS256",
+            headers={"kid": self.stream_signing_key_id},
+        )
+
     def get_video_signed_url(self, video_uid):
+        # Tokens without the key id are rejected by Cloudflare
+        if self.stream_signing_key and self.stream_signing_key_id:
+            token = self.sign_video_token(video_uid)
+            return {"result": {"token": token}, "success": True}
+        if self.stream_signing_key or self.stream_signing_key_id:
+            logger.warning(
+                "Se requieren CF_STREAM_SIGNING_KEY_ID y CF_STREAM_SIGNING_KEY "
+                "para firmar los videos, se usa la API de Cloudflare"
+            )
+
         # The URL for the API request
         url = f"https://api.cloudflare.com/client/v4/accounts/{self.account_id}/stream/{video_uid}/token"
 
@@ -1,21 +1,119 @@
 import logging
+import threading
 import time
 
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Process-wide session so the connections to Culqi are kept alive and
+    reused between requests. Only idempotent methods are retried, charges
+    and orders are never sent twice.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retries = Retry(
+                    total=settings.CULQI_MAX_RETRIES,
+                    backoff_factor=0.5,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=frozenset(["GET"]),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=10, max_retries=retries
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def reset_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+class LatencyMetrics:
+    """In-process latency stats of the Culqi API grouped by endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, endpoint, elapsed_ms, error=False):
+        with self._lock:
+            stats = self._stats.setdefault(
+                endpoint,
+                {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0},
+            )
+            stats["count"] += 1
+            stats["errors"] += int(error)
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    **stats,
+                    "avg_ms": stats["total_ms"] / stats["count"],
+                }
+                for endpoint, stats in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+metrics = LatencyMetrics()
+
 
 class Culqi:
     def __init__(self):
         self.api_key = settings.CULQI_API_KEY
-        self.base_url = "https://api.culqi.com/v2"
+        self.base_url = settings.CULQI_BASE_URL
+        self.timeout = settings.CULQI_TIMEOUT
+        self.session = get_session()
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}",
         }
 
+    def _request(self, method, endpoint, path, **kwargs):
+        url = f"{self.base_url}/{path}"
+        start = time.perf_counter()
+        error = True
+        try:
+            response = self.session.request(
+                method,
+                url,
+                headers=self.headers,
+                timeout=self.timeout,
+                **kwargs,
+            )
+            error = response.status_code >= 500
+            return response
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            metrics.record(endpoint, elapsed_ms, error=error)
+            logger.debug(f"Culqi '{endpoint}' respondió en {elapsed_ms:.0f} ms")
+
     def create_charge(self, sell, **kwargs):
         payload = {
             "amount": int(sell.total_cost * 100),
@@ -31,8 +129,9 @@ class Culqi:
             },
             "authentication_3DS": kwargs.get("parameters_3DS", None),
         }
-        url = f"{self.base_url}/charges"
-        response = requests.post(url, json=payload, headers=self.headers)
+        response = self._request(
+            "POST", "create_charge", "charges", json=payload
+        )
 
         return response
 
@@ -52,9 +151,10 @@ class Culqi:
             },
             "confirm": False,
         }
-        url = f"{self.base_url}/orders"
         try:
-            response = requests.post(url, json=payload, headers=self.headers)
+            response = self._request(
+                "POST", "create_order", "orders", json=payload
+            )
             response.raise_for_status()
             logger.info(f"Orden creada exitosamente con id: {response.json()}")
             return response.json()
@@ -72,9 +172,10 @@ class Culqi:
             return {"error": str(e)}
 
     def consult_order(self, order_id):
-        url = f"{self.base_url}/orders/{order_id}"
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self._request(
+                "GET", "consult_order", f"orders/{order_id}"
+            )
             response.raise_for_status()
             return response.json()
         except requests.HTTPError: